@@ -0,0 +1,281 @@
+"""
+Máy chủ giả lập cho hai upstream của API, chạy cục bộ trong thread nền:
+
+- `FakeGovolunteer`: phục vụ các trang Elementor của `fixtures` tại /news/, /news/N/, /clubs/,
+  các trang danh mục và mọi đường dẫn bài viết (có ETag, trả 304 khi If-None-Match khớp).
+- `FakeSheets`: phần Sheets API v4 mà repo dùng (`spreadsheets.get`, `values.get`,
+  `values.update`, `values.batchUpdate`) cùng endpoint cấp token OAuth, trên các sheet
+  tổng hợp có số dòng tuỳ chọn. App thật gọi vào đây qua googleapiclient như với Google.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from benchmarks import fixtures
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Header và body được ghi riêng; không tắt Nagle thì mỗi phản hồi chờ thêm ~40ms delayed ACK.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8",
+              headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Client (app hoặc load test) đóng kết nối giữa chừng là bình thường khi đo tải.
+        pass
+
+
+class _FakeServer:
+    handler_class = _Handler
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        handler = type("Handler", (self.handler_class,), {"upstream": self})
+        self._server = _QuietServer(("127.0.0.1", 0), handler)
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _delay(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class _GovolunteerHandler(_Handler):
+    def do_GET(self):
+        site: FakeGovolunteer = self.upstream
+        site._delay()
+        path = urlsplit(self.path).path
+        html, etag = site.page(path)
+        if html is None:
+            self._send(404, b"Not Found")
+        elif self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+        else:
+            self._send(200, html, headers={"ETag": etag})
+
+
+class FakeGovolunteer(_FakeServer):
+    handler_class = _GovolunteerHandler
+
+    def __init__(self, news_pages: int = 10, latency: float = 0.0):
+        super().__init__(latency)
+        self.news_pages = news_pages
+        self._pages: Dict[str, Tuple[bytes, str]] = {}
+        self._lock = threading.Lock()
+
+    def _render(self, path: str) -> Optional[str]:
+        base = self.url
+        news = re.fullmatch(r"/news/(?:(\d+)/)?", path)
+        if news:
+            page = int(news.group(1) or 1)
+            return fixtures.news_page(base, page, self.news_pages) if page <= self.news_pages else None
+        if path == "/clubs/":
+            return fixtures.clubs_page(base)
+        name = path.strip("/")
+        if name in fixtures.GENERIC_PAGES:
+            return fixtures.generic_page(base, name)
+        if re.fullmatch(r"/[\w-]+/", path):
+            return fixtures.article_page(base, name)
+        return None
+
+    def page(self, path: str) -> Tuple[Optional[bytes], Optional[str]]:
+        cached = self._pages.get(path)
+        if cached is None:
+            html = self._render(path)
+            if html is None:
+                return None, None
+            body = html.encode("utf-8")
+            cached = (body, f'"{len(body):x}-{hash(path) & 0xffffffff:x}"')
+            with self._lock:
+                self._pages[path] = cached
+        return cached
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _trim(row: List[str]) -> List[str]:
+    # Sheets API bỏ các ô trống ở cuối mỗi dòng.
+    end = len(row)
+    while end and row[end - 1] == "":
+        end -= 1
+    return row[:end]
+
+
+class _SheetsHandler(_Handler):
+    def _route(self) -> Tuple[Optional[str], str]:
+        path = urlsplit(self.path).path
+        match = re.fullmatch(r"/v4/spreadsheets/([^/]+)(/.*)?", path)
+        if not match:
+            return None, path
+        return unquote(match.group(1)), unquote(match.group(2) or "")
+
+    def do_GET(self):
+        sheets: FakeSheets = self.upstream
+        sheets._delay()
+        spreadsheet_id, rest = self._route()
+        if spreadsheet_id is None:
+            self._send(404, b"{}", "application/json")
+        elif rest.startswith("/values/"):
+            self._send(200, sheets.values_json(spreadsheet_id, rest[len("/values/"):]), "application/json")
+        else:
+            row_count = len(sheets.rows(spreadsheet_id))
+            body = {"sheets": [{"properties": {"gridProperties": {"rowCount": row_count}}}]}
+            self._send(200, json.dumps(body).encode(), "application/json")
+
+    def do_PUT(self):
+        sheets: FakeSheets = self.upstream
+        sheets._delay()
+        spreadsheet_id, rest = self._route()
+        body = self._read_json()
+        range_ = rest[len("/values/"):]
+        sheets.write(spreadsheet_id, range_, body.get("values", []))
+        self._send(200, json.dumps({"updatedRange": range_}).encode(), "application/json")
+
+    def do_POST(self):
+        sheets: FakeSheets = self.upstream
+        sheets._delay()
+        if urlsplit(self.path).path == "/token":
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            token = {"access_token": "benchmark-token", "token_type": "Bearer", "expires_in": 3600}
+            self._send(200, json.dumps(token).encode(), "application/json")
+            return
+        spreadsheet_id, rest = self._route()
+        if spreadsheet_id is None or rest != "/values:batchUpdate":
+            self._send(404, b"{}", "application/json")
+            return
+        body = self._read_json()
+        for item in body.get("data", []):
+            sheets.write(spreadsheet_id, item["range"], item.get("values", []))
+        result = {"spreadsheetId": spreadsheet_id, "totalUpdatedCells": len(body.get("data", []))}
+        self._send(200, json.dumps(result).encode(), "application/json")
+
+
+class FakeSheets(_FakeServer):
+    handler_class = _SheetsHandler
+
+    def __init__(self, row_count: int = 1000, latency: float = 0.0):
+        super().__init__(latency)
+        self.row_count = row_count
+        self._sheets: Dict[str, List[List[str]]] = {}
+        # Body JSON của lần đọc toàn sheet, tính lại sau mỗi lần ghi.
+        self._full_json: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.writes = 0
+
+    @property
+    def token_uri(self) -> str:
+        return f"{self.url}/token"
+
+    def rows(self, spreadsheet_id: str) -> List[List[str]]:
+        rows = self._sheets.get(spreadsheet_id)
+        if rows is None:
+            with self._lock:
+                rows = self._sheets.get(spreadsheet_id)
+                if rows is None:
+                    rows = self._sheets[spreadsheet_id] = fixtures.sheet_rows(self.row_count)
+        return rows
+
+    def _row_range(self, spreadsheet_id: str, range_: str) -> Tuple[int, int]:
+        rows = self.rows(spreadsheet_id)
+        _, _, a1 = range_.partition("!")
+        match = re.fullmatch(r"(\d+):(\d+)", a1)
+        if match:
+            return int(match.group(1)), min(int(match.group(2)), len(rows))
+        return 1, len(rows)
+
+    def values_json(self, spreadsheet_id: str, range_: str) -> bytes:
+        if "!" not in range_:
+            body = self._full_json.get(spreadsheet_id)
+            if body is None:
+                body = self._full_json[spreadsheet_id] = self._values_body(spreadsheet_id, range_, 1, None)
+            return body
+        start, end = self._row_range(spreadsheet_id, range_)
+        return self._values_body(spreadsheet_id, range_, start, end)
+
+    def _values_body(self, spreadsheet_id: str, range_: str, start: int, end: Optional[int]) -> bytes:
+        rows = self.rows(spreadsheet_id)
+        values = [_trim(row) for row in rows[start - 1:end]]
+        return json.dumps({"range": range_, "majorDimension": "ROWS", "values": values},
+                          ensure_ascii=False).encode("utf-8")
+
+    def write(self, spreadsheet_id: str, range_: str, values: List[List[str]]):
+        _, _, a1 = range_.partition("!")
+        match = re.fullmatch(r"([A-Za-z]+)(\d+)", a1)
+        if not match or not values:
+            return
+        column, row_number = _column_index(match.group(1)), int(match.group(2))
+        rows = self.rows(spreadsheet_id)
+        with self._lock:
+            while len(rows) < row_number:
+                rows.append([])
+            row = rows[row_number - 1]
+            row.extend([""] * (column + 1 - len(row)))
+            row[column] = str(values[0][0])
+            self._full_json.pop(spreadsheet_id, None)
+            self.writes += 1
+
+
+def write_service_account(path: str, token_uri: str):
+    """Ghi một file service account giả (khoá RSA mới) trỏ `token_uri` về máy chủ giả lập."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    info = {
+        "type": "service_account",
+        "project_id": "benchmark",
+        "private_key_id": "benchmark",
+        "private_key": pem,
+        "client_email": "benchmark@benchmark.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": token_uri,
+    }
+    with open(path, "w") as f:
+        json.dump(info, f)
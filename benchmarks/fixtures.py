@@ -0,0 +1,119 @@
+"""
+Trang HTML Elementor và dữ liệu sheet tổng hợp cho benchmark.
+
+HTML được dựng theo đúng cấu trúc và class mà `scraper.py` / `scraper_lxml.py` đọc trên
+govolunteerhcmc.vn (container `.elementor-<id>`, `section.elementor-top-section`,
+`article.elementor-post`, nút `a.elementor-button` của trang CLB, khối nội dung bài viết...),
+kèm phần header/menu/script thừa để kích thước trang gần với trang thật. Mọi thứ đều tất
+định nên kết quả giữa các lần chạy so sánh được với nhau.
+"""
+from typing import List
+
+# Container của từng trang (khớp với selector trong scraper.py).
+GENERIC_PAGES = {
+    "chuong-trinh-chien-dich-du-an": "elementor-1165",
+    "skills": "elementor-1181",
+    "ideas": "elementor-1242",
+}
+NEWS_CONTAINER = "elementor-1096"
+CLUBS_CONTAINER = "elementor-1048"
+POSTS_PER_NEWS_PAGE = 12
+
+SHEET_HEADERS = ["STT", "User_Name", "CCCD", "Email", "Activity", "Hours", "PDF_Requested"]
+
+_LOREM = ("Chiến dịch tình nguyện mang yêu thương đến với bà con vùng sâu vùng xa, "
+          "cùng các bạn trẻ thành phố lan toả tinh thần sẻ chia và trách nhiệm cộng đồng. ")
+
+
+def _page(base_url: str, body: str) -> str:
+    # Phần đầu/cuối trang mô phỏng theme WordPress: menu, stylesheet, script nhúng.
+    menu = "".join(
+        f'<li class="menu-item menu-item-{i}"><a href="{base_url}/menu-{i}/">Mục {i}</a></li>' for i in range(40))
+    scripts = "".join(
+        f'<script id="elementor-frontend-js-{i}">var elementorFrontendConfig{i} = {{"environmentMode":'
+        f'{{"edit":false,"wpPreview":false}},"version":"3.18.{i}"}};</script>' for i in range(25))
+    return (
+        '<!DOCTYPE html><html lang="vi"><head><meta charset="UTF-8"><title>GoVolunteer HCMC</title>'
+        + "".join(f'<link rel="stylesheet" href="{base_url}/wp-content/css/post-{i}.css">' for i in range(30))
+        + f'</head><body class="wp-theme elementor-default"><header><nav><ul>{menu}</ul></nav></header>'
+        + f"<main>{body}</main><footer><p>{_LOREM * 3}</p></footer>{scripts}</body></html>"
+    )
+
+
+def _post(base_url: str, slug: str, title: str) -> str:
+    image = f"{base_url}/wp-content/uploads/2024/03/{slug}-300x200.jpg"
+    return (
+        f'<article class="elementor-post elementor-grid-item post-{slug} type-post status-publish">'
+        f'<a class="elementor-post__thumbnail__link" href="{base_url}/{slug}/">'
+        f'<div class="elementor-post__thumbnail"><img width="300" height="200" src="{image}" '
+        f'class="attachment-medium size-medium" alt="" loading="lazy"></div></a>'
+        f'<div class="elementor-post__text"><h3 class="elementor-post__title">'
+        f'<a href="{base_url}/{slug}/">{title}</a></h3>'
+        f'<div class="elementor-post__excerpt"><p>{_LOREM}</p></div>'
+        f'<a class="elementor-post__read-more" href="{base_url}/{slug}/">Xem thêm »</a></div></article>'
+    )
+
+
+def news_page(base_url: str, page: int, max_pages: int) -> str:
+    posts = "".join(
+        _post(base_url, f"tin-tuc-{page}-{i}", f"Nhật ký tình nguyện {page}.{i}") for i in range(POSTS_PER_NEWS_PAGE))
+    anchor = f'<div class="e-load-more-anchor" data-page="{page}" data-max-page="{max_pages}"></div>'
+    body = (f'<div class="elementor {NEWS_CONTAINER}"><section class="elementor-top-section">'
+            f'<div class="elementor-posts-container elementor-posts">{posts}</div>{anchor}</section></div>')
+    return _page(base_url, body)
+
+
+def generic_page(base_url: str, name: str, sections: int = 8, posts_per_section: int = 9) -> str:
+    container = GENERIC_PAGES[name]
+    parts = []
+    for s in range(sections):
+        posts = "".join(_post(base_url, f"{name}-{s}-{i}", f"{name} {s}.{i}") for i in range(posts_per_section))
+        parts.append(
+            f'<section class="elementor-section elementor-top-section"><div class="elementor-container">'
+            f'<div class="elementor-widget-heading"><h2 class="elementor-heading-title elementor-size-default">'
+            f'Danh mục {s}</h2></div><div class="elementor-posts">{posts}</div></div></section>')
+    return _page(base_url, f'<div class="elementor {container}">{"".join(parts)}</div>')
+
+
+def clubs_page(base_url: str, categories: int = 6, clubs_per_category: int = 15) -> str:
+    parts = []
+    for c in range(categories):
+        parts.append(
+            f'<section class="elementor-section elementor-top-section"><h2 class="elementor-heading-title">'
+            f'Khối {c}</h2></section>')
+        clubs = []
+        for i in range(clubs_per_category):
+            slug = f"clb-{c}-{i}"
+            clubs.append(
+                f'<article class="ecs-post-loop post-{slug}"><div class="elementor-widget-theme-post-featured-image">'
+                f'<img src="{base_url}/wp-content/uploads/2024/01/{slug}-150x150.png" alt=""></div>'
+                f'<a class="elementor-button elementor-size-sm" href="{base_url}/{slug}/">CLB {c}.{i}</a></article>')
+        parts.append(f'<section class="elementor-section elementor-top-section">{"".join(clubs)}</section>')
+    return _page(base_url, f'<div class="elementor {CLUBS_CONTAINER}">{"".join(parts)}</div>')
+
+
+def article_page(base_url: str, slug: str, paragraphs: int = 40) -> str:
+    content = "".join(
+        f"<p>{_LOREM}<strong>{slug}</strong> đoạn {i}.</p>"
+        + (f'<figure><img src="{base_url}/wp-content/uploads/2024/02/{slug}-{i}.jpg" alt=""></figure>'
+           if i % 5 == 0 else "")
+        for i in range(paragraphs))
+    body = (
+        f'<div class="elementor elementor-location-single"><h1 class="elementor-heading-title">{slug}</h1>'
+        f'<div class="elementor-element elementor-widget elementor-widget-theme-post-content">'
+        f'<div class="elementor-widget-container">{content}</div></div></div>')
+    return _page(base_url, body)
+
+
+def person(i: int):
+    """(User_Name, CCCD) của dòng dữ liệu thứ i, để load test tra đúng người có trong sheet."""
+    return f"Nguyễn Văn Tình Nguyện {i}", f"{i:012d}"
+
+
+def sheet_rows(count: int) -> List[List[str]]:
+    """Dòng tiêu đề + `count` dòng dữ liệu (mỗi người có một dòng)."""
+    rows = [list(SHEET_HEADERS)]
+    for i in range(count):
+        name, cccd = person(i)
+        rows.append([str(i + 1), name, cccd, "", f"Chiến dịch {i % 50}", str(4 + i % 20), ""])
+    return rows
@@ -0,0 +1,169 @@
+"""Chạy API thật (uvicorn, tiến trình con) trên hai upstream giả lập và đo từng endpoint."""
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import requests
+
+from benchmarks import fixtures
+from benchmarks.report import summarize
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Endpoint(NamedTuple):
+    name: str
+    method: str
+    # Nhận (random.Random, số dòng sheet), trả về (path, body JSON hoặc None).
+    build: Callable[[random.Random, int], Any]
+    # Chỉ cần đo một lần cho mọi kích thước sheet.
+    scraper: bool = False
+
+
+def _lookup(path: str):
+    def build(rng: random.Random, rows: int):
+        name, cccd = fixtures.person(rng.randrange(rows))
+        return path, {"fullName": name, "citizenId": cccd}
+    return build
+
+
+def _batch(path: str, size: int = 100):
+    def build(rng: random.Random, rows: int):
+        items = []
+        for _ in range(size):
+            name, cccd = fixtures.person(rng.randrange(rows))
+            items.append({"fullName": name, "citizenId": cccd})
+        return path, {"items": items}
+    return build
+
+
+def _request_pdf(rng: random.Random, rows: int):
+    name, cccd = fixtures.person(rng.randrange(rows))
+    return "/request-pdf", {"fullName": name, "citizenId": cccd, "email": f"tnv{rng.randrange(rows)}@example.com"}
+
+
+ENDPOINTS = [
+    Endpoint("GET /news", "GET", lambda rng, rows: ("/news", None), scraper=True),
+    Endpoint("GET /clubs", "GET", lambda rng, rows: ("/clubs", None), scraper=True),
+    Endpoint("GET /chuong-trinh-chien-dich-du-an", "GET",
+             lambda rng, rows: ("/chuong-trinh-chien-dich-du-an", None), scraper=True),
+    Endpoint("GET /skills", "GET", lambda rng, rows: ("/skills", None), scraper=True),
+    Endpoint("GET /ideas", "GET", lambda rng, rows: ("/ideas", None), scraper=True),
+    Endpoint("GET /article", "GET", None, scraper=True),  # path dựng theo URL của máy chủ giả lập
+    Endpoint("POST /find-activities", "POST", _lookup("/find-activities")),
+    Endpoint("POST /find-certificates", "POST", _lookup("/find-certificates")),
+    Endpoint("POST /find-activities/batch", "POST", _batch("/find-activities/batch")),
+    Endpoint("POST /find-certificates/batch", "POST", _batch("/find-certificates/batch")),
+    Endpoint("POST /request-pdf", "POST", _request_pdf),
+    Endpoint("GET /all-data/activities", "GET", lambda rng, rows: ("/all-data/activities?limit=1000", None)),
+    Endpoint("GET /admin/search", "GET",
+             lambda rng, rows: (f"/admin/search?q=nguyen+van+tinh+nguyen+{rng.randrange(rows)}", None)),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """`uvicorn src.main:app` trong tiến trình con, với môi trường trỏ về các upstream giả lập."""
+
+    def __init__(self, env: Dict[str, str], workers: int = 1, log_path: Optional[str] = None):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env}
+        self.workers = workers
+        self.log_path = log_path
+        self._process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    def start(self, timeout: float = 120) -> float:
+        """Khởi động và chờ mọi job làm nóng của bộ lập lịch chạy xong; trả về số giây đã chờ."""
+        started = time.perf_counter()
+        self._log = open(self.log_path or os.devnull, "w")
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=REPO_ROOT, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"API dừng khi khởi động (mã {self._process.returncode}); xem {self.log_path}.")
+            try:
+                jobs = requests.get(f"{self.url}/scheduler/jobs", timeout=2).json()
+                if all(job["runs"] > 0 for job in jobs):
+                    return time.perf_counter() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError("API không sẵn sàng kịp thời gian chờ.")
+
+    def startup_report(self) -> Dict[str, Any]:
+        """Thời gian từng giai đoạn khởi động do chính worker ghi lại (GET /startup)."""
+        return requests.get(f"{self.url}/startup", timeout=5).json()
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._log is not None:
+            self._log.close()
+
+
+def run_endpoint(base_url: str, endpoint: Endpoint, build: Callable[[random.Random, int], Any], rows: int,
+                 total: int, concurrency: int, seed: int = 0) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    requests_to_send = [build(rng, rows) for _ in range(total)]
+    local = threading.local()
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def send(item):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        path, body = item
+        started = time.perf_counter()
+        try:
+            response = session.request(endpoint.method, base_url + path, json=body, timeout=120)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, requests_to_send))
+    wall = time.perf_counter() - wall_started
+    return {"endpoint": endpoint.name, "rows": rows, **summarize(latencies, errors[0], wall)}
+
+
+def run_load_test(server: AppServer, site_url: str, rows: int, total: int, concurrency: int,
+                  include_scraper: bool = True) -> List[Dict[str, Any]]:
+    results = []
+    for endpoint in ENDPOINTS:
+        if endpoint.scraper and not include_scraper:
+            continue
+        build = endpoint.build
+        if endpoint.name == "GET /article":
+            # Một tập bài viết cố định: lần đầu tải về, các lần sau trúng cache bài viết.
+            build = lambda rng, rows: (f"/article?url={site_url}/bai-viet-{rng.randrange(50)}/", None)
+        results.append(run_endpoint(server.url, endpoint, build, rows, total, concurrency))
+    return results
@@ -0,0 +1,82 @@
+"""Thời gian parse (theo từng engine) và thời gian chạy trọn vẹn của các hàm trong scraper.py."""
+import contextlib
+import io
+import time
+from typing import Any, Callable, Dict, List
+
+import scraper
+from benchmarks import fixtures
+from benchmarks.fake_upstreams import FakeGovolunteer
+from benchmarks.report import summarize
+
+ENGINES = ("bs4", "lxml")
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    samples = []
+    # Các hàm scrape in log bằng emoji; không để chúng lẫn vào bảng kết quả.
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def parse_cases(base_url: str, news_pages: int) -> Dict[str, Callable[[Callable], Callable[[], Any]]]:
+    """Tên case -> hàm nhận bộ parser (theo engine) và trả về lời gọi cần đo."""
+    news = fixtures.news_page(base_url, 1, news_pages)
+    clubs = fixtures.clubs_page(base_url)
+    article = fixtures.article_page(base_url, "bai-viet-mau")
+    cases = {
+        "parse_news_page": lambda get: lambda: get("parse_news_page")(news, 1),
+        "parse_clubs": lambda get: lambda: get("parse_clubs")(clubs),
+        "extract_article_content": lambda get: lambda: get("extract_article_content")(article),
+    }
+    for name, container in fixtures.GENERIC_PAGES.items():
+        html = fixtures.generic_page(base_url, name)
+        cases[f"parse_generic_page[{name}]"] = (
+            lambda get, html=html, container=container: lambda: get("parse_generic_page")(html, f".{container}"))
+    return cases
+
+
+def run_parse_benchmarks(repeat: int = 20, news_pages: int = 10) -> List[Dict[str, Any]]:
+    results = []
+    for name, case in parse_cases("http://127.0.0.1", news_pages).items():
+        for engine in ENGINES:
+            call = case(lambda parser_name, engine=engine: scraper._get_parser(parser_name, engine))
+            call()  # nạp lười scraper_lxml / biên dịch XPath trước khi đo
+            results.append({"function": name, "engine": engine, **summarize(_time(call, repeat))})
+    return results
+
+
+def run_scrape_benchmarks(site: FakeGovolunteer, repeat: int = 5) -> List[Dict[str, Any]]:
+    """Chạy trọn các hàm scrape (tải từ máy chủ giả lập + parse)."""
+    original_base_url = scraper.BASE_URL
+    scraper.BASE_URL = site.url
+    article_url = f"{site.url}/bai-viet-mau/"
+    try:
+        functions = {
+            "scrape_news": scraper.scrape_news,
+            "scrape_clubs": scraper.scrape_clubs,
+            "scrape_chuong_trinh_chien_dich_du_an": scraper.scrape_chuong_trinh_chien_dich_du_an,
+            "scrape_skills": scraper.scrape_skills,
+            "scrape_ideas": scraper.scrape_ideas,
+            "scrape_article_with_requests": lambda parser: scraper.scrape_article_with_requests(article_url, parser),
+            "revalidate_article[200]": lambda parser: scraper.revalidate_article(article_url, parser=parser),
+        }
+        with contextlib.redirect_stdout(io.StringIO()):
+            previous_news = scraper.scrape_news()
+        functions["scrape_news_incremental"] = (
+            lambda parser: scraper.scrape_news_incremental(previous_news, parser))
+        etag = scraper.revalidate_article(article_url)[2]
+        functions["revalidate_article[304]"] = lambda parser: scraper.revalidate_article(article_url, etag, parser=parser)
+
+        results = []
+        for name, fn in functions.items():
+            for engine in ENGINES:
+                call = lambda fn=fn, engine=engine: fn(parser=engine)
+                results.append({"function": name, "engine": engine, **summarize(_time(call, repeat))})
+        return results
+    finally:
+        scraper.BASE_URL = original_base_url
@@ -0,0 +1,45 @@
+"""Thống kê độ trễ và in bảng kết quả benchmark."""
+import math
+from typing import Any, Dict, List, Sequence
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    """Phân vị theo nearest-rank (p từ 0 đến 100)."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: Sequence[float], errors: int = 0, wall_seconds: float = None) -> Dict[str, Any]:
+    """Tóm tắt một loạt lần đo (giây) thành ms; `wall_seconds` dùng để tính throughput."""
+    count = len(latencies)
+    summary = {
+        "requests": count + errors,
+        "errors": errors,
+        "mean_ms": sum(latencies) / count * 1000 if count else float("nan"),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000 if count else float("nan"),
+    }
+    if wall_seconds:
+        summary["throughput_rps"] = (count + errors) / wall_seconds
+    return summary
+
+
+def format_table(title: str, rows: List[Dict[str, Any]], columns: Sequence[str]) -> str:
+    def cell(value):
+        if isinstance(value, float):
+            return "-" if math.isnan(value) else f"{value:.2f}"
+        return str(value)
+
+    table = [list(columns)] + [[cell(row.get(column, "")) for column in columns] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    lines = [f"\n== {title} =="]
+    for n, line in enumerate(table):
+        lines.append("  ".join(value.ljust(width) if i == 0 else value.rjust(width)
+                               for i, (value, width) in enumerate(zip(line, widths))))
+        if n == 0:
+            lines.append("  ".join("-" * width for width in widths))
+    return "\n".join(lines)
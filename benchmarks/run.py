@@ -0,0 +1,113 @@
+"""
+Benchmark offline cho API: không cần mạng, không cần credentials.json thật.
+
+Chạy từ thư mục gốc của repo:
+
+    python -m benchmarks.run                              # sheet 1k và 100k dòng
+    python -m benchmarks.run --rows 1000,1000000          # tới 1 triệu dòng (cần vài GB RAM)
+    python -m benchmarks.run --skip-load --parse-repeat 50
+    python -m benchmarks.run --json bench.json            # lưu kết quả để so sánh giữa các lần chạy
+
+Các bước:
+1. Parse: thời gian từng hàm parse của scraper.py trên HTML Elementor mẫu, cho cả hai engine.
+2. Scrape: thời gian chạy trọn từng hàm scrape trên máy chủ govolunteerhcmc.vn giả lập.
+3. Load test: với mỗi kích thước sheet, khởi động API thật (uvicorn) trỏ về các upstream giả
+   lập, chờ bộ lập lịch làm nóng dữ liệu, rồi gửi `--requests` request tới từng endpoint với
+   `--concurrency` luồng; báo cáo throughput, p50 và p99, cùng thời gian khởi động của worker
+   (GET /startup) và thời gian tới khi dữ liệu được làm nóng.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict
+
+from benchmarks.fake_upstreams import FakeGovolunteer, FakeSheets, write_service_account
+from benchmarks.load_test import AppServer, run_load_test
+from benchmarks.parse_bench import run_parse_benchmarks, run_scrape_benchmarks
+from benchmarks.report import format_table
+
+TIMING_COLUMNS = ("mean_ms", "p50_ms", "p99_ms", "max_ms")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline cho GoVolunteer API.")
+    parser.add_argument("--rows", default="1000,100000", help="Các kích thước sheet, cách nhau bằng dấu phẩy.")
+    parser.add_argument("--requests", type=int, default=200, help="Số request cho mỗi endpoint.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Số request đồng thời.")
+    parser.add_argument("--workers", type=int, default=1, help="Số worker uvicorn.")
+    parser.add_argument("--news-pages", type=int, default=10, help="Số trang /news của máy chủ giả lập.")
+    parser.add_argument("--upstream-latency", type=float, default=0.0,
+                        help="Độ trễ (giây) thêm vào mỗi phản hồi của upstream giả lập.")
+    parser.add_argument("--parse-repeat", type=int, default=20, help="Số lần lặp khi đo parse.")
+    parser.add_argument("--scrape-repeat", type=int, default=5, help="Số lần lặp khi đo hàm scrape.")
+    parser.add_argument("--skip-parse", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--json", dest="json_path", help="Ghi toàn bộ kết quả ra file JSON.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = _parse_args(argv)
+    sizes = [int(size) for size in args.rows.split(",") if size.strip()]
+    results: Dict[str, Any] = {"config": vars(args)}
+
+    site = FakeGovolunteer(news_pages=args.news_pages, latency=args.upstream_latency).start()
+    try:
+        if not args.skip_parse:
+            results["parse"] = run_parse_benchmarks(args.parse_repeat, args.news_pages)
+            print(format_table("Parse (ms / lần)", results["parse"], ("function", "engine") + TIMING_COLUMNS))
+            results["scrape"] = run_scrape_benchmarks(site, args.scrape_repeat)
+            print(format_table("Scrape trên máy chủ giả lập (ms / lần)", results["scrape"],
+                               ("function", "engine") + TIMING_COLUMNS))
+
+        if not args.skip_load:
+            results["load"] = []
+            results["startup"] = []
+            for n, rows in enumerate(sizes):
+                results["load"] += _run_load_round(args, site, rows, include_scraper=n == 0, results=results)
+            print(format_table("Load test", results["load"],
+                               ("endpoint", "rows", "requests", "errors", "throughput_rps", "p50_ms", "p99_ms",
+                                "max_ms")))
+            print(format_table("Khởi động + làm nóng dữ liệu", results["startup"], ("rows", "worker_seconds", "seconds")))
+    finally:
+        site.stop()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nĐã ghi kết quả vào {args.json_path}")
+    return 0
+
+
+def _run_load_round(args, site: FakeGovolunteer, rows: int, include_scraper: bool, results: Dict[str, Any]):
+    print(f"\n▶ Load test với sheet {rows} dòng...", file=sys.stderr)
+    sheets = FakeSheets(row_count=rows, latency=args.upstream_latency).start()
+    with tempfile.TemporaryDirectory(prefix="govolunteer-bench-") as tmp:
+        credentials = os.path.join(tmp, "credentials.json")
+        write_service_account(credentials, sheets.token_uri)
+        server = AppServer({
+            "GOVOLUNTEER_BASE_URL": site.url,
+            "SHEETS_API_ENDPOINT": f"{sheets.url}/",
+            "GOOGLE_SERVICE_ACCOUNT_FILE": credentials,
+            "SNAPSHOT_DB": os.path.join(tmp, "snapshots.db"),
+            "PDF_QUEUE_DB": os.path.join(tmp, "pdf_requests.db"),
+            "QUOTA_DB": os.path.join(tmp, "quota.db"),
+            # Máy chủ giả lập không có hạn mức; đo chính API chứ không đo token bucket.
+            "SHEETS_READ_REQUESTS_PER_MINUTE": os.getenv("SHEETS_READ_REQUESTS_PER_MINUTE", "1000000"),
+            "SHEETS_WRITE_REQUESTS_PER_MINUTE": os.getenv("SHEETS_WRITE_REQUESTS_PER_MINUTE", "1000000"),
+        }, workers=args.workers, log_path=os.path.join(tmp, "api.log"))
+        try:
+            seconds = server.start()
+            report = server.startup_report()
+            results["startup"].append({"rows": rows, "seconds": seconds, "worker_seconds": report["total_seconds"],
+                                       "phases": report["phases"]})
+            return run_load_test(server, site.url, rows, args.requests, args.concurrency, include_scraper)
+        finally:
+            server.stop()
+            sheets.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
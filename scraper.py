@@ -1,39 +1,124 @@
-import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+import os
 import re
 import sys
+import threading
 import time
 
+from src.circuit_breaker import (CircuitBreaker, CircuitOpenError, DeadlineExceededError, RetryPolicy,
+                                 current_deadline, deadline_scope)
+
 # --- Cấu hình chung ---
-BASE_URL = "https://govolunteerhcmc.vn"
+# Có thể trỏ sang một máy chủ giả lập (ví dụ khi chạy benchmarks/ offline).
+BASE_URL = os.getenv("GOVOLUNTEER_BASE_URL", "https://govolunteerhcmc.vn").rstrip("/")
 FALLBACK_IMAGE_URL = "https://govolunteerhcmc.vn/wp-content/uploads/2024/02/logo-gv-tron.png"
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
     'Referer': 'https://www.google.com/'
 }
 
+# Số trang /news được tải song song và khoảng cách tối thiểu giữa hai request (lịch sự với máy chủ).
+NEWS_CONCURRENCY = int(os.getenv("SCRAPER_NEWS_CONCURRENCY", "4"))
+MIN_REQUEST_INTERVAL_SECONDS = float(os.getenv("SCRAPER_MIN_REQUEST_INTERVAL", "0.25"))
+
+# Timeout kết nối và timeout đọc (giây) riêng biệt: máy chủ sập thì lỗi sau vài giây thay vì 20 giây.
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_READ_TIMEOUT", "10"))
+# Số lần thử tối đa cho một request khi gặp lỗi tạm thời (timeout, mất kết nối, 5xx, 429).
+RETRY_ATTEMPTS = int(os.getenv("SCRAPER_RETRY_ATTEMPTS", "3"))
+
+# Engine parse: "bs4" (BeautifulSoup, mặc định) hoặc "lxml" (lxml.html + XPath, nhanh hơn).
+# Có thể chọn theo từng lời gọi qua tham số `parser` của các hàm scrape.
+SCRAPER_PARSER = os.getenv("SCRAPER_PARSER", "bs4")
+
+# requests và bs4 chỉ được import ở lần dùng đầu tiên (trong hàm) để API khởi động nhanh;
+# lần import đó chạy trong job làm nóng cache, không phải trong request.
+
+# --- HTTP session dùng chung (keep-alive, connection pool) ---
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> "requests.Session":
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(NEWS_CONCURRENCY, 10))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+class _RateLimiter:
+    """Giãn cách thời điểm bắt đầu các request tới cùng một máy chủ."""
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+_rate_limiter = _RateLimiter(MIN_REQUEST_INTERVAL_SECONDS)
+
+# Khi govolunteerhcmc.vn lỗi liên tiếp, mọi request tới nó bị từ chối ngay (CircuitOpenError)
+# trong một khoảng thời gian; API trả dữ liệu đã cache thay vì chiếm luồng chờ timeout.
+govolunteer_breaker = CircuitBreaker("govolunteerhcmc.vn")
+_retry_policy = RetryPolicy(RETRY_ATTEMPTS)
+
+def _is_transient_error(exc: BaseException) -> bool:
+    import requests
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code >= 500 or exc.response.status_code == 429
+    return False
+
+def _fetch(url: str, headers: dict = None, rate_limited: bool = False) -> "requests.Response":
+    """
+    GET qua session dùng chung, qua circuit breaker và thử lại lỗi tạm thời.
+    Ném requests.RequestException nếu lỗi (kể cả requests.Timeout khi không còn kịp
+    trước deadline của lời gọi), CircuitOpenError nếu breaker đang mở.
+    """
+    import requests
+    def attempt():
+        response = get_session().get(url, headers=headers, timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS))
+        response.raise_for_status()
+        return response
+    try:
+        return govolunteer_breaker.call(attempt, _is_transient_error, _retry_policy,
+                                        before_attempt=(lambda budget: _rate_limiter.wait()) if rate_limited else None,
+                                        attempt_timeout=CONNECT_TIMEOUT_SECONDS + READ_TIMEOUT_SECONDS)
+    except DeadlineExceededError as e:
+        raise requests.Timeout(str(e)) from e
+
 def get_high_res_image_url(url: str):
     """Loại bỏ các hậu tố kích thước ảnh (-150x150, -300x200, v.v.) để lấy ảnh gốc chất lượng cao."""
     if not url:
         return FALLBACK_IMAGE_URL
     return re.sub(r'-\d{2,4}x\d{2,4}(?=\.\w+$)', '', url)
 
-def _scrape_generic_page(url: str, container_selector: str):
-    """Hàm chung để cào các trang có cấu trúc section > h2 > article."""
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=20)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"❌ Lỗi khi cào {url}: {e}", file=sys.stderr)
-        return []
+def _soup(html: str):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "lxml")
 
-    soup = BeautifulSoup(response.text, "lxml")
-    sections_data = []
+def _parse_generic_page(html: str, container_selector: str):
+    """Parse trang có cấu trúc section > h2 > article; trả về None nếu không thấy container."""
+    soup = _soup(html)
     page_container = soup.select_one(container_selector)
     if not page_container:
-        print(f"❌ Không tìm thấy container '{container_selector}' tại {url}", file=sys.stderr)
-        return []
+        return None
 
+    sections_data = []
     for sec in page_container.select("section.elementor-top-section"):
         h2 = sec.select_one("h2.elementor-heading-title")
         if not h2 or not h2.text.strip():
@@ -69,72 +154,156 @@ def _scrape_generic_page(url: str, container_selector: str):
     
     return sections_data
 
+def _scrape_generic_page(url: str, container_selector: str, parser: str = None):
+    """Hàm chung để cào các trang có cấu trúc section > h2 > article."""
+    import requests
+    try:
+        response = _fetch(url)
+    except (requests.RequestException, CircuitOpenError) as e:
+        print(f"❌ Lỗi khi cào {url}: {e}", file=sys.stderr)
+        return []
+
+    sections_data = _get_parser("parse_generic_page", parser)(response.text, container_selector)
+    if sections_data is None:
+        print(f"❌ Không tìm thấy container '{container_selector}' tại {url}", file=sys.stderr)
+        return []
+    return sections_data
+
 # --- TRIỂN KHAI CÁC HÀM SCRAPE ---
 
-def scrape_news():
-    """Cào toàn bộ bài viết từ trang /news và các trang con."""
-    print("🚀 Bắt đầu cào dữ liệu từ /news/...")
-    all_articles = []
-    page = 1
-    max_pages = 1
-    category_name = "Nhật ký tình nguyện"
+def _parse_news_page(html: str, page: int):
+    """Trả về (danh sách bài viết, data-max-page nếu là trang 1)."""
+    soup = _soup(html)
+    max_pages = None
+    if page == 1:
+        anchor = soup.select_one(".e-load-more-anchor[data-max-page]")
+        if anchor: max_pages = int(anchor['data-max-page'])
+
+    articles = []
+    container = soup.select_one(".elementor-1096")
+    if not container:
+        return articles, max_pages
+
+    for post in container.select("article.elementor-post"):
+        a_tag = post.select_one("h3.elementor-post__title a")
+        if not a_tag or not a_tag.get('href'): continue
+        img_tag = post.select_one(".elementor-post__thumbnail img")
+        image_url = get_high_res_image_url(img_tag.get('src') if img_tag else None)
+        excerpt_tag = post.select_one(".elementor-post__excerpt p")
+        articles.append({
+            "title": a_tag.text.strip(),
+            "link": a_tag['href'],
+            "imageUrl": image_url,
+            "excerpt": excerpt_tag.text.strip() if excerpt_tag else "Không có mô tả.",
+        })
+    return articles, max_pages
+
+def _news_page_url(page: int) -> str:
     base_news_url = f"{BASE_URL}/news/"
+    return f"{base_news_url}{page}/" if page > 1 else base_news_url
 
-    while page <= max_pages:
-        current_url = f"{base_news_url}{page}/" if page > 1 else base_news_url
-        print(f"📄 Đang cào trang: {current_url}")
-        try:
-            response = requests.get(current_url, headers=HEADERS, timeout=20)
-            response.raise_for_status()
-        except requests.RequestException as e:
-            print(f"❌ Lỗi khi cào trang {current_url}: {e}", file=sys.stderr)
-            break
+def _fetch_news_page(page: int, parser: str = None):
+    """Tải và parse một trang /news; trả về None nếu lỗi mạng."""
+    import requests
+    current_url = _news_page_url(page)
+    print(f"📄 Đang cào trang: {current_url}")
+    try:
+        response = _fetch(current_url, rate_limited=True)
+    except (requests.RequestException, CircuitOpenError) as e:
+        print(f"❌ Lỗi khi cào trang {current_url}: {e}", file=sys.stderr)
+        return None
+    return _get_parser("parse_news_page", parser)(response.text, page)
 
-        soup = BeautifulSoup(response.text, "lxml")
-        if page == 1:
-            anchor = soup.select_one(".e-load-more-anchor[data-max-page]")
-            if anchor: max_pages = int(anchor['data-max-page'])
-            print(f"🔍 Tìm thấy tổng cộng {max_pages} trang.")
+NEWS_CATEGORY = "Nhật ký tình nguyện"
 
-        container = soup.select_one(".elementor-1096")
-        if not container:
-            page += 1
-            continue
-            
-        for post in container.select("article.elementor-post"):
-            a_tag = post.select_one("h3.elementor-post__title a")
-            if not a_tag or not a_tag.get('href'): continue
-            img_tag = post.select_one(".elementor-post__thumbnail img")
-            image_url = get_high_res_image_url(img_tag.get('src') if img_tag else None)
-            excerpt_tag = post.select_one(".elementor-post__excerpt p")
-            all_articles.append({
-                "title": a_tag.text.strip(),
-                "link": a_tag['href'],
-                "imageUrl": image_url,
-                "excerpt": excerpt_tag.text.strip() if excerpt_tag else "Không có mô tả.",
-            })
-        page += 1
-        if page <= max_pages: time.sleep(1)
+def scrape_news(concurrency: int = NEWS_CONCURRENCY, parser: str = None):
+    """
+    Cào toàn bộ bài viết từ trang /news và các trang con.
+
+    Trang 1 được tải trước để đọc `data-max-page`, các trang còn lại tải song song
+    (tối đa `concurrency` request cùng lúc, giãn cách bởi rate limiter). Kết quả
+    vẫn giữ thứ tự trang; gặp trang lỗi thì dừng ở đó như cách cào tuần tự cũ.
+    """
+    print("🚀 Bắt đầu cào dữ liệu từ /news/...")
+    category_name = NEWS_CATEGORY
+
+    first = _fetch_news_page(1, parser)
+    if first is None:
+        return []
+    all_articles, max_pages = first
+    max_pages = max_pages or 1
+    print(f"🔍 Tìm thấy tổng cộng {max_pages} trang.")
+
+    remaining = range(2, max_pages + 1)
+    if concurrency > 1 and len(remaining) > 1:
+        # Deadline của lời gọi (nếu có) là thread-local, nên truyền tiếp cho các luồng tải trang.
+        deadline = current_deadline()
+        def fetch(page: int):
+            with deadline_scope(deadline):
+                return _fetch_news_page(page, parser)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scrape-news") as pool:
+            results = list(pool.map(fetch, remaining))
+    else:
+        results = []
+        for page in remaining:
+            result = _fetch_news_page(page, parser)
+            results.append(result)
+            if result is None:
+                break
+
+    for result in results:
+        if result is None:
+            break
+        all_articles.extend(result[0])
 
     unique_articles = list({article['link']: article for article in all_articles}.values())
     print(f"✅ Cào xong! Tìm thấy {len(unique_articles)} bài viết độc nhất.")
     return [{"category": category_name, "articles": unique_articles}] if unique_articles else []
 
-def scrape_clubs():
-    """Cào dữ liệu các CLB, Đội, Nhóm từ trang /clubs một cách ổn định."""
-    url = f"{BASE_URL}/clubs/"
-    print(f"🚀 Bắt đầu cào dữ liệu từ {url}...")
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=20)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        print(f"❌ Lỗi khi cào {url}: {e}", file=sys.stderr)
-        return []
+def scrape_news_incremental(previous, parser: str = None):
+    """
+    Làm mới /news dựa trên kết quả lần trước (`previous`, cùng dạng trả về của scrape_news).
+
+    Bài mới chỉ xuất hiện ở đầu danh sách, nên các trang được tải lần lượt từ mới đến cũ
+    và dừng ở trang đầu tiên không có link mới; thường chỉ cần một request. Bài mới được
+    đặt trước các bài đã biết, bài đã biết nằm trên các trang vừa tải được cập nhật lại.
+    Bài bị xoá hoặc sửa ở các trang không tải tới chỉ được phát hiện ở lần cào toàn bộ.
+    """
+    known = previous[0]["articles"] if previous else []
+    known_links = {article['link'] for article in known}
+    print(f"🚀 Bắt đầu cào tăng dần /news/ ({len(known)} bài đã biết)...")
 
-    soup = BeautifulSoup(response.text, "lxml")
+    fresh = []
+    seen = {}
+    page, max_pages = 1, 1
+    while page <= max_pages:
+        result = _fetch_news_page(page, parser)
+        if result is None:
+            if page == 1:
+                return []
+            break
+        articles, page_max = result
+        if page == 1:
+            max_pages = page_max or 1
+        new_on_page = [article for article in articles if article['link'] not in known_links]
+        fresh.extend(new_on_page)
+        seen.update((article['link'], article) for article in articles)
+        if articles and not new_on_page:
+            break
+        page += 1
+
+    merged = fresh + [seen.get(article['link'], article) for article in known]
+    unique_articles = list({article['link']: article for article in merged}.values())
+    print(f"✅ Cào tăng dần xong sau {min(page, max_pages)} trang: {len(fresh)} bài mới, "
+          f"tổng {len(unique_articles)} bài.")
+    return [{"category": NEWS_CATEGORY, "articles": unique_articles}] if unique_articles else []
+
+def _parse_clubs(html: str):
+    """Parse trang /clubs; trả về None nếu không thấy container."""
+    soup = _soup(html)
     page_container = soup.select_one(".elementor-1048")
     if not page_container:
-        return []
+        return None
 
     category_map = {}
     current_category = None
@@ -173,48 +342,107 @@ def scrape_clubs():
         if articles:
             unique_articles = list({article['link']: article for article in articles}.values())
             final_data.append({"category": name, "articles": unique_articles})
+    return final_data
+
+def scrape_clubs(parser: str = None):
+    """Cào dữ liệu các CLB, Đội, Nhóm từ trang /clubs một cách ổn định."""
+    import requests
+    url = f"{BASE_URL}/clubs/"
+    print(f"🚀 Bắt đầu cào dữ liệu từ {url}...")
+    try:
+        response = _fetch(url)
+    except (requests.RequestException, CircuitOpenError) as e:
+        print(f"❌ Lỗi khi cào {url}: {e}", file=sys.stderr)
+        return []
+
+    final_data = _get_parser("parse_clubs", parser)(response.text)
+    if final_data is None:
+        return []
 
     print(f"✅ Cào xong /clubs! Tìm thấy {len(final_data)} danh mục.")
     return final_data
 
 
-def scrape_chuong_trinh_chien_dich_du_an():
+def scrape_chuong_trinh_chien_dich_du_an(parser: str = None):
     """Cào dữ liệu từ trang /chuong-trinh-chien-dich-du-an."""
     url = f"{BASE_URL}/chuong-trinh-chien-dich-du-an/"
     print(f"🚀 Bắt đầu cào dữ liệu từ {url}...")
-    data = _scrape_generic_page(url, ".elementor-1165")
+    data = _scrape_generic_page(url, ".elementor-1165", parser)
     print(f"✅ Cào xong {url}! Tìm thấy {len(data)} danh mục.")
     return data
 
-def scrape_skills():
+def scrape_skills(parser: str = None):
     """Cào dữ liệu từ trang /skills."""
     url = f"{BASE_URL}/skills/"
     print(f"🚀 Bắt đầu cào dữ liệu từ {url}...")
-    data = _scrape_generic_page(url, ".elementor-1181")
+    data = _scrape_generic_page(url, ".elementor-1181", parser)
     print(f"✅ Cào xong {url}! Tìm thấy {len(data)} danh mục.")
     return data
 
-def scrape_ideas():
+def scrape_ideas(parser: str = None):
     """Cào dữ liệu từ trang /ideas."""
     url = f"{BASE_URL}/ideas/"
     print(f"🚀 Bắt đầu cào dữ liệu từ {url}...")
-    data = _scrape_generic_page(url, ".elementor-1242")
+    data = _scrape_generic_page(url, ".elementor-1242", parser)
     print(f"✅ Cào xong {url}! Tìm thấy {len(data)} danh mục.")
     return data
 
-def scrape_article_with_requests(article_url: str):
+def _extract_article_content(html: str):
+    soup = _soup(html)
+    content_div = soup.select_one(".elementor-widget-theme-post-content .elementor-widget-container")
+    if not content_div:
+        return None
+    return str(content_div)
+
+_BS4_PARSERS = {
+    "parse_generic_page": _parse_generic_page,
+    "parse_news_page": _parse_news_page,
+    "parse_clubs": _parse_clubs,
+    "extract_article_content": _extract_article_content,
+}
+
+def _get_parser(name: str, parser: str = None):
+    """Chọn hàm parse theo engine: tham số `parser` nếu có, không thì SCRAPER_PARSER."""
+    engine = parser or SCRAPER_PARSER
+    if engine == "lxml":
+        import scraper_lxml
+        return getattr(scraper_lxml, name)
+    if engine != "bs4":
+        raise ValueError(f"Engine parse không hợp lệ: {engine}")
+    return _BS4_PARSERS[name]
+
+def scrape_article_with_requests(article_url: str, parser: str = None):
     """Lấy nội dung chi tiết của một bài viết."""
+    import requests
     print(f"🚀 Sử dụng `requests` để lấy dữ liệu bài viết: {article_url}")
     try:
-        response = requests.get(article_url, headers=HEADERS, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "lxml")
-        content_div = soup.select_one(".elementor-widget-theme-post-content .elementor-widget-container")
-        if not content_div:
+        response = _fetch(article_url)
+        content = _get_parser("extract_article_content", parser)(response.text)
+        if content is None:
             print("❌ Không tìm thấy thẻ div chứa nội dung.", file=sys.stderr)
             return None
         print("✅ Lấy nội dung bài viết thành công!")
-        return str(content_div)
-    except requests.RequestException as e:
+        return content
+    except (requests.RequestException, CircuitOpenError) as e:
         print(f"❌ Lỗi khi dùng requests cho bài viết: {e}", file=sys.stderr)
-        return None
\ No newline at end of file
+        return None
+
+def revalidate_article(article_url: str, etag: str = None, last_modified: str = None, parser: str = None):
+    """
+    GET có điều kiện (If-None-Match / If-Modified-Since) cho một bài viết.
+
+    Trả về (not_modified, content, etag, last_modified). Khi máy chủ trả 304 thì
+    không parse lại trang và `content` là None. Ném requests.RequestException nếu lỗi mạng,
+    CircuitOpenError nếu breaker của máy chủ đang mở.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    response = _fetch(article_url, headers=headers)
+    new_etag = response.headers.get("ETag") or etag
+    new_last_modified = response.headers.get("Last-Modified") or last_modified
+    if response.status_code == 304:
+        return True, None, new_etag, new_last_modified
+    return False, _get_parser("extract_article_content", parser)(response.text), new_etag, new_last_modified
@@ -0,0 +1,269 @@
+"""
+Engine parse dùng trực tiếp `lxml.html` với các biểu thức XPath biên dịch sẵn.
+
+Mỗi hàm ở đây cho ra kết quả giống hệt hàm BeautifulSoup tương ứng trong
+`scraper.py`, chỉ khác ở tốc độ: chỉ riêng container của trang (`.elementor-1096`,
+`.elementor-1165`...) được parse bằng libxml2 (C) thay vì cả trang, và với bài viết
+thì chỉ riêng đoạn nội dung được đưa qua BeautifulSoup để giữ nguyên định dạng HTML đầu ra.
+"""
+import re
+import threading
+
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+from scraper import FALLBACK_IMAGE_URL, get_high_res_image_url
+
+
+def _cls(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_EXPRESSIONS = {
+    "sections": f".//section[{_cls('elementor-top-section')}]",
+    "heading": f".//h2[{_cls('elementor-heading-title')}]",
+    "posts": f".//article[{_cls('elementor-post')}]",
+    "post_link": f".//h3[{_cls('elementor-post__title')}]//a",
+    "post_image": f".//*[{_cls('elementor-post__thumbnail')}]//img",
+    "post_excerpt": f".//*[{_cls('elementor-post__excerpt')}]//p",
+    "load_more_anchor": f"descendant-or-self::*[{_cls('e-load-more-anchor')} and @data-max-page]",
+    "club_posts": f".//article[{_cls('ecs-post-loop')} or {_cls('elementor-post')}]",
+    "club_button": f".//a[{_cls('elementor-button')}]",
+    "club_image": f".//*[{_cls('elementor-widget-theme-post-featured-image')}]//img",
+    "article_content": f"//*[{_cls('elementor-widget-theme-post-content')}]//*[{_cls('elementor-widget-container')}]",
+    "post_content_container": f".//*[{_cls('elementor-widget-container')}]",
+}
+
+# Đối tượng XPath đã biên dịch không nên dùng chung giữa các thread (trang /news
+# được parse song song), nên mỗi thread giữ một bộ riêng.
+_local = threading.local()
+
+
+def _xpath(name: str) -> etree.XPath:
+    compiled = getattr(_local, "compiled", None)
+    if compiled is None:
+        compiled = _local.compiled = {}
+    expr = compiled.get(name)
+    if expr is None:
+        source = _EXPRESSIONS.get(name) or f"//*[{_cls(name)}]"
+        expr = compiled[name] = etree.XPath(source)
+    return expr
+
+
+def _first(name: str, node):
+    found = _xpath(name)(node)
+    return found[0] if found else None
+
+
+def _text(node) -> str:
+    return node.text_content().strip()
+
+
+def _document(page_html: str):
+    if not page_html or not page_html.strip():
+        return None
+    try:
+        return lxml_html.document_fromstring(page_html)
+    except ValueError:
+        # Chuỗi unicode có khai báo encoding: parse lại dưới dạng bytes.
+        return lxml_html.document_fromstring(page_html.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+
+def _container(doc, container_selector: str):
+    # Chỉ hỗ trợ selector một class (".elementor-1165"), đúng như các trang đang dùng.
+    return _first(container_selector.lstrip("."), doc) if doc is not None else None
+
+
+_FEED_CHUNK = 16 * 1024
+# Đoạn từ "<" của thẻ mở tới vị trí tên class: phải đang ở trong giá trị thuộc tính class.
+_CLASS_ATTR_PREFIX = re.compile(r"<([a-zA-Z][\w-]*)\s[^<>]*?\bclass\s*=\s*[\"'][^\"'<>]*$")
+
+
+def _find_start_tag(page_html: str, class_name: str):
+    """(vị trí, tên thẻ) của thẻ mở đầu tiên có class `class_name`; None nếu không thấy."""
+    pos = page_html.find(class_name)
+    while pos != -1:
+        end = pos + len(class_name)
+        if not (pos and (page_html[pos - 1].isalnum() or page_html[pos - 1] in "-_")) \
+                and not (end < len(page_html) and (page_html[end].isalnum() or page_html[end] in "-_")):
+            start = page_html.rfind("<", 0, pos)
+            match = _CLASS_ATTR_PREFIX.match(page_html, start, pos) if start != -1 else None
+            if match is not None:
+                return start, match.group(1).lower()
+        pos = page_html.find(class_name, end)
+    return None
+
+
+def _inside(page_html: str, pos: int, open_tag: str, close_tag: str) -> bool:
+    return page_html.rfind(open_tag, 0, pos) > page_html.rfind(close_tag, 0, pos)
+
+
+def _partial_container(page_html: str, class_name: str):
+    """
+    Parse riêng cây con của phần tử đầu tiên có class `class_name`: bắt đầu từ thẻ mở của
+    nó và dừng ngay khi thẻ đóng được parse, bỏ qua phần header/menu/script còn lại của trang.
+    Trả về False nếu không định vị chắc chắn được thẻ mở (nơi gọi parse cả trang).
+    """
+    found = _find_start_tag(page_html, class_name) if page_html else None
+    if found is None:
+        return False
+    start, tag = found
+    if _inside(page_html, start, "<script", "</script") or _inside(page_html, start, "<!--", "-->"):
+        return False
+    # Đoạn HTML bắt đầu từ thẻ mở của container nên nó là con đầu tiên của <body>; khi <body>
+    # đã có con thứ hai (phần còn lại của trang) thì cây con của container đã đầy đủ.
+    parser = etree.HTMLPullParser(events=("start",), tag="body")
+    parser.set_element_class_lookup(lxml_html.HtmlElementClassLookup())
+    body = None
+    for offset in range(start, len(page_html), _FEED_CHUNK):
+        parser.feed(page_html[offset:offset + _FEED_CHUNK])
+        if body is None:
+            body = next((element for _, element in parser.read_events()), None)
+        if body is not None and len(body) > 1:
+            break
+    else:
+        root = parser.close()
+        body = root.find("body") if root is not None else None
+    container = body[0] if body is not None and len(body) else None
+    if container is None or container.tag != tag or class_name not in (container.get("class") or "").split():
+        return False
+    return container
+
+
+def _page_container(page_html: str, container_selector: str):
+    container = _partial_container(page_html, container_selector.lstrip("."))
+    if container is False:
+        container = _container(_document(page_html), container_selector)
+    return container
+
+
+def parse_generic_page(page_html: str, container_selector: str):
+    page_container = _page_container(page_html, container_selector)
+    if page_container is None:
+        return None
+
+    sections_data = []
+    for sec in _xpath("sections")(page_container):
+        h2 = _first("heading", sec)
+        if h2 is None or not _text(h2):
+            continue
+        category_name = _text(h2)
+
+        articles = []
+        for post in _xpath("posts")(sec):
+            a_tag = _first("post_link", post)
+            if a_tag is None or not a_tag.get('href'):
+                continue
+
+            img_tag = _first("post_image", post)
+            image_url = FALLBACK_IMAGE_URL
+            if img_tag is not None:
+                src = img_tag.get('src') or img_tag.get('data-src')
+                if src:
+                    image_url = get_high_res_image_url(src)
+
+            excerpt_tag = _first("post_excerpt", post)
+            excerpt = _text(excerpt_tag) if excerpt_tag is not None else "Không có mô tả."
+
+            articles.append({
+                "title": _text(a_tag),
+                "link": a_tag.get('href'),
+                "imageUrl": image_url,
+                "excerpt": excerpt,
+            })
+
+        if articles:
+            unique_articles = list({article['link']: article for article in articles}.values())
+            sections_data.append({"category": category_name, "articles": unique_articles})
+
+    return sections_data
+
+
+def parse_news_page(page_html: str, page: int):
+    container = _page_container(page_html, ".elementor-1096")
+    max_pages = None
+    if page == 1:
+        # Nút "tải thêm" nằm trong container; nếu không thấy ở đó thì tìm trên cả trang.
+        anchor = _first("load_more_anchor", container) if container is not None else None
+        if anchor is None:
+            doc = _document(page_html)
+            anchor = _first("load_more_anchor", doc) if doc is not None else None
+        if anchor is not None:
+            max_pages = int(anchor.get('data-max-page'))
+
+    articles = []
+    if container is None:
+        return articles, max_pages
+
+    for post in _xpath("posts")(container):
+        a_tag = _first("post_link", post)
+        if a_tag is None or not a_tag.get('href'):
+            continue
+        img_tag = _first("post_image", post)
+        image_url = get_high_res_image_url(img_tag.get('src') if img_tag is not None else None)
+        excerpt_tag = _first("post_excerpt", post)
+        articles.append({
+            "title": _text(a_tag),
+            "link": a_tag.get('href'),
+            "imageUrl": image_url,
+            "excerpt": _text(excerpt_tag) if excerpt_tag is not None else "Không có mô tả.",
+        })
+    return articles, max_pages
+
+
+def parse_clubs(page_html: str):
+    page_container = _page_container(page_html, ".elementor-1048")
+    if page_container is None:
+        return None
+
+    category_map = {}
+    current_category = None
+
+    for section in _xpath("sections")(page_container):
+        title_tag = _first("heading", section)
+        if title_tag is not None and _text(title_tag):
+            current_category = _text(title_tag)
+            if current_category not in category_map:
+                category_map[current_category] = []
+            continue
+
+        if current_category:
+            for post in _xpath("club_posts")(section):
+                button = _first("club_button", post)
+                if button is None or not button.get('href'):
+                    continue
+                img_tag = _first("club_image", post)
+                image_url = get_high_res_image_url(img_tag.get('src') if img_tag is not None else None)
+                category_map[current_category].append({
+                    "title": _text(button),
+                    "link": button.get('href'),
+                    "imageUrl": image_url,
+                    "excerpt": ""
+                })
+
+    final_data = []
+    for name, articles in category_map.items():
+        if articles:
+            unique_articles = list({article['link']: article for article in articles}.values())
+            final_data.append({"category": name, "articles": unique_articles})
+    return final_data
+
+
+def extract_article_content(page_html: str):
+    post_content = _partial_container(page_html, "elementor-widget-theme-post-content")
+    content_div = _first("post_content_container", post_content) if post_content is not False else None
+    if content_div is None:
+        # Không định vị được khối nội dung, hoặc khối đầu tiên không có container: tìm
+        # trên cả trang như engine cũ.
+        doc = _document(page_html)
+        content_div = _first("article_content", doc) if doc is not None else None
+    if content_div is None:
+        return None
+    # Chỉ parse lại đoạn nội dung bằng BeautifulSoup để chuỗi HTML trả về
+    # giống hệt `str(tag)` của engine cũ (thẻ rỗng dạng `<br/>`, thứ tự thuộc tính...).
+    fragment = lxml_html.tostring(content_div, encoding="unicode", method="html", with_tail=False)
+    soup = BeautifulSoup(fragment, "lxml")
+    root = soup.body.find(True, recursive=False) if soup.body else None
+    return str(root) if root is not None else None
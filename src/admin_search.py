@@ -0,0 +1,69 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+from googleapiclient.errors import HttpError
+
+from src.name_search import SearchHit, fold_name
+from src.circuit_breaker import CircuitOpenError
+from src.quota import QuotaExceededError
+from src.upstream import run_sheets
+from src.sheets_utils import activity_search, certificate_search
+
+router = APIRouter()
+
+SEARCHES = {
+    "activities": activity_search,
+    "certificates": certificate_search,
+}
+SEARCH_MAX_LIMIT = 200
+
+
+def _search(names: List[str], q: str, mode: str, offset: int, limit: int) -> Tuple[int, List[Tuple[str, SearchHit]]]:
+    """(tổng số kết quả, các kết quả của trang [offset, offset + limit)) trên các sheet `names`."""
+    try:
+        matches = []
+        for name in names:
+            index = SEARCHES[name].current()
+            matches.append((name, index, index.search(q, mode)))
+        total = sum(len(rows) for _, _, rows in matches)
+        # Chỉ dựng SearchHit cho các dòng của trang được yêu cầu.
+        page = []
+        for name, index, rows in matches:
+            if len(page) >= limit:
+                break
+            if offset >= len(rows):
+                offset -= len(rows)
+                continue
+            page.extend((name, index.hit(row)) for row in rows[offset:offset + limit - len(page)])
+            offset = 0
+        return total, page
+    except (QuotaExceededError, CircuitOpenError):
+        raise
+    except HttpError as e:
+        raise HTTPException(status_code=503, detail=f"Không thể truy cập Google Sheet. Mã lỗi: {e.resp.status}")
+    except Exception:
+        raise HTTPException(status_code=503, detail="Lỗi máy chủ nội bộ khi xử lý sheet.")
+
+
+@router.get("/admin/search")
+async def admin_search(
+    q: str = Query(..., min_length=1, description="Tên (có hoặc không dấu) hoặc tiền tố CCCD."),
+    sheet: str = Query("all", pattern="^(all|activities|certificates)$"),
+    mode: str = Query("prefix", pattern="^(prefix|contains)$"),
+    limit: int = Query(50, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Lấy từ next_cursor của trang trước."),
+):
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="cursor không hợp lệ.")
+    offset = int(cursor or 0)
+    names = list(SEARCHES) if sheet == "all" else [sheet]
+
+    total, page = await run_sheets(_search, names, q, mode, offset, limit)
+    results: List[Dict[str, Any]] = [{"sheet": name, "name": hit.name, "record": hit.record} for name, hit in page]
+    return {
+        "query": fold_name(q),
+        "mode": mode,
+        "total": total,
+        "results": results,
+        "next_cursor": str(offset + limit) if offset + limit < total else None,
+    }
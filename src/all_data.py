@@ -0,0 +1,227 @@
+import asyncio
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from src.circuit_breaker import CircuitOpenError
+from src.sheets_client import execute, is_transient_error, sheets_clients, READONLY_SCOPES
+from src.sheets_utils import ACTIVITY_SHEET_ID, CERTIFICATE_SHEET_ID, SHEET_NAME
+from src.quota import QuotaExceededError
+from src.upstream import iterate_in_pool, run_sheets
+
+router = APIRouter()
+
+SHEETS = {
+    "activities": ACTIVITY_SHEET_ID,
+    "certificates": CERTIFICATE_SHEET_ID,
+}
+# Số dòng đọc mỗi lần khi stream, và giới hạn `limit` cho một trang. rowCount tính cả các
+# dòng trống của lưới, nên ALL_DATA_CHUNK_ROWS dòng trống liên tiếp được coi là hết dữ liệu.
+ALL_DATA_CHUNK_ROWS = 1000
+ALL_DATA_MAX_LIMIT = 5000
+FIRST_DATA_ROW = 2
+
+
+class _SheetReader:
+    """Đọc một sheet theo từng khoảng dòng thay vì tải toàn bộ vào bộ nhớ.
+
+    Các lần đọc chạy trên nhiều luồng của pool, nên client được lấy theo luồng ở mỗi lần gọi.
+    """
+
+    def __init__(self, spreadsheet_id: str, fields: Optional[str]):
+        self.spreadsheet_id = spreadsheet_id
+        meta = execute(sheets_clients.spreadsheets(READONLY_SCOPES).get(
+            spreadsheetId=spreadsheet_id, ranges=SHEET_NAME,
+            fields="sheets.properties.gridProperties.rowCount"), spreadsheet_id)
+        self.row_count = meta["sheets"][0]["properties"]["gridProperties"]["rowCount"]
+        self.all_headers = self._read_rows(1, 1)
+        self.all_headers = self.all_headers[0] if self.all_headers else []
+        self.columns = _projection(self.all_headers, fields)
+        self.headers = [self.all_headers[i] for i in self.columns]
+
+    def _read_rows(self, start: int, end: int) -> List[List[str]]:
+        if start > end:
+            return []
+        api = sheets_clients.spreadsheets(READONLY_SCOPES)
+        result = execute(api.values().get(
+            spreadsheetId=self.spreadsheet_id, range=f"{SHEET_NAME}!{start}:{end}"), self.spreadsheet_id)
+        return result.get("values", [])
+
+    def to_record(self, row: List[str]) -> Dict[str, Any]:
+        headers = self.all_headers
+        return {headers[i]: (row[i] if i < len(row) else "") for i in self.columns}
+
+    def _data_ends(self, blank_from: int, end: int) -> bool:
+        """Các dòng từ `blank_from` tới `end` đều trống: dữ liệu đã hết chưa (đọc thử tiếp nếu cần)?"""
+        probe_end = min(self.row_count, blank_from + ALL_DATA_CHUNK_ROWS - 1)
+        if end >= probe_end:
+            return True
+        return not self._read_rows(end + 1, probe_end)
+
+    def page(self, start: int, limit: Optional[int]) -> Dict[str, Any]:
+        end = self.row_count if limit is None else min(self.row_count, start + limit - 1)
+        rows = self._read_rows(start, end) if self.all_headers else []
+        # Sheets bỏ các dòng trống ở cuối khoảng đọc; chúng chỉ là cuối dữ liệu nếu đủ dài.
+        more = (limit is not None and end < self.row_count and bool(self.all_headers)
+                and not self._data_ends(start + len(rows), end))
+        if more:
+            rows += [[]] * (end - start + 1 - len(rows))
+        records = [self.to_record(row) for row in rows]
+        return {
+            "count": len(records),
+            "headers": self.headers,
+            "data": records,
+            "next_cursor": str(end + 1) if more else None,
+        }
+
+    def iter_chunks(self, start: int = FIRST_DATA_ROW):
+        if not self.all_headers:
+            return
+        blank_from = start  # dòng đầu tiên của đoạn trống liên tiếp ngay trước `start`
+        while start <= self.row_count:
+            end = min(self.row_count, start + ALL_DATA_CHUNK_ROWS - 1)
+            rows = self._read_rows(start, end)
+            if rows:
+                # Giữ các dòng trống nằm giữa hai khối có dữ liệu, như dòng trống giữa một khối.
+                yield [self.to_record(row) for row in [[]] * (start - blank_from) + rows]
+                blank_from = start + len(rows)
+            if end - blank_from + 1 >= ALL_DATA_CHUNK_ROWS:
+                return
+            start = end + 1
+
+
+def _projection(headers: List[str], fields: Optional[str]) -> List[int]:
+    if not fields:
+        return list(range(len(headers)))
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    missing = [name for name in names if name not in headers]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Không có cột: {', '.join(missing)}")
+    return [headers.index(name) for name in names]
+
+
+def _parse_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return FIRST_DATA_ROW
+    if not cursor.isdigit() or int(cursor) < FIRST_DATA_ROW:
+        raise HTTPException(status_code=400, detail="cursor không hợp lệ.")
+    return int(cursor)
+
+
+def _sheets_error(e: Exception) -> HTTPException:
+    # Sheets lỗi tạm thời (đã thử lại) là lỗi upstream: 503 để client thử lại, không phải 500.
+    if is_transient_error(e):
+        return HTTPException(status_code=503, detail="Google Sheets API tạm thời không khả dụng.")
+    return HTTPException(status_code=500, detail=str(e))
+
+
+async def _open_readers(names: List[str], fields: Optional[str]) -> List[_SheetReader]:
+    """Mở (đọc metadata + dòng tiêu đề) các sheet song song."""
+    if not sheets_clients.is_available():
+        raise HTTPException(status_code=503, detail="Google Sheets API không khả dụng.")
+    try:
+        return list(await asyncio.gather(*(run_sheets(_SheetReader, SHEETS[name], fields) for name in names)))
+    except (HTTPException, QuotaExceededError, CircuitOpenError):
+        raise
+    except Exception as e:
+        raise _sheets_error(e)
+
+
+async def _read_pages(readers: List[_SheetReader], cursors: List[Optional[int]], limit: Optional[int]):
+    def read(reader: _SheetReader, start: Optional[int]):
+        if start is None:
+            return {"count": 0, "headers": reader.headers, "data": [], "next_cursor": None}
+        return reader.page(start, limit)
+
+    try:
+        return list(await asyncio.gather(*(run_sheets(read, reader, start) for reader, start in zip(readers, cursors))))
+    except (HTTPException, QuotaExceededError, CircuitOpenError):
+        raise
+    except Exception as e:
+        raise _sheets_error(e)
+
+
+async def _stream_ndjson(named_readers: List[Tuple[Optional[str], _SheetReader]]) -> AsyncIterator[str]:
+    for name, reader in named_readers:
+        async for chunk in iterate_in_pool("sheets", reader.iter_chunks()):
+            lines = []
+            for record in chunk:
+                line = {"sheet": name, **record} if name else record
+                lines.append(json.dumps(line, ensure_ascii=False))
+            if lines:
+                yield "\n".join(lines) + "\n"
+
+
+async def _stream_csv(reader: _SheetReader) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(reader.headers)
+    async for chunk in iterate_in_pool("sheets", reader.iter_chunks()):
+        for record in chunk:
+            writer.writerow(record.values())
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
+def _stream_response(named_readers: List[Tuple[Optional[str], _SheetReader]], output: str, filename: str):
+    if output == "csv":
+        return StreamingResponse(
+            _stream_csv(named_readers[0][1]), media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'})
+    return StreamingResponse(_stream_ndjson(named_readers), media_type="application/x-ndjson")
+
+
+@router.get("/all-data")
+async def get_all_data_for_auditing(
+    limit: Optional[int] = Query(None, ge=1, le=ALL_DATA_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Dạng '<dòng activities>,<dòng certificates>'; '-' là đã hết."),
+    fields: Optional[str] = Query(None, description="Các cột cần lấy, ví dụ User_Name,CCCD"),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+):
+    names = list(SHEETS)
+    readers = await _open_readers(names, fields)
+
+    if output == "ndjson":
+        return _stream_response(list(zip(names, readers)), output, "all-data")
+
+    cursors: List[Optional[int]] = [FIRST_DATA_ROW] * len(names)
+    if cursor:
+        parts = cursor.split(",")
+        if len(parts) != len(names):
+            raise HTTPException(status_code=400, detail="cursor không hợp lệ.")
+        cursors = [None if part == "-" else _parse_cursor(part) for part in parts]
+
+    pages = await _read_pages(readers, cursors, limit)
+    next_parts = [page.pop("next_cursor") or "-" for page in pages]
+    response: Dict[str, Any] = dict(zip(names, pages))
+    if limit is not None:
+        response["next_cursor"] = None if all(part == "-" for part in next_parts) else ",".join(next_parts)
+    return response
+
+
+@router.get("/all-data/{sheet}")
+async def get_sheet_data_for_auditing(
+    sheet: str,
+    limit: Optional[int] = Query(None, ge=1, le=ALL_DATA_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="Số dòng bắt đầu, lấy từ next_cursor của trang trước."),
+    fields: Optional[str] = Query(None, description="Các cột cần lấy, ví dụ User_Name,CCCD"),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$"),
+):
+    if sheet not in SHEETS:
+        raise HTTPException(status_code=404, detail=f"Không có sheet '{sheet}'.")
+    reader = (await _open_readers([sheet], fields))[0]
+
+    if output != "json":
+        return _stream_response([(None, reader)], output, sheet)
+
+    page = (await _read_pages([reader], [_parse_cursor(cursor)], limit))[0]
+    if limit is None:
+        page.pop("next_cursor")
+    return page
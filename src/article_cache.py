@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from scraper import revalidate_article
+from src.cache import SingleFlight
+from src.circuit_breaker import CircuitOpenError
+from src.metrics import instrument_upstream
+
+# Ngân sách bộ nhớ (byte, tính trên HTML đã trích xuất) và thời gian coi bài viết là còn mới.
+ARTICLE_CACHE_MAX_BYTES = int(os.getenv("ARTICLE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+ARTICLE_CACHE_TTL_SECONDS = int(os.getenv("ARTICLE_CACHE_TTL_SECONDS", "3600"))
+
+_revalidate_article = instrument_upstream("govolunteer", "revalidate_article", revalidate_article)
+
+
+class _CachedArticle:
+    __slots__ = ("content", "etag", "last_modified", "checked_at", "size")
+
+    def __init__(self, content: str, etag: Optional[str], last_modified: Optional[str]):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked_at = time.time()
+        self.size = len(content.encode("utf-8"))
+
+
+class ArticleCache:
+    """
+    Cache LRU cho nội dung bài viết, giới hạn theo tổng số byte thay vì số phần tử.
+
+    Khi một mục hết TTL, cache gửi GET có điều kiện (ETag / Last-Modified); nếu máy
+    chủ trả 304 thì chỉ gia hạn mục cũ, không tải lại và không parse lại trang.
+    """
+
+    def __init__(self, max_bytes: int = ARTICLE_CACHE_MAX_BYTES, ttl: int = ARTICLE_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _CachedArticle]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidated = 0
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            item = self._entries.get(url)
+            if item is not None:
+                self._entries.move_to_end(url)
+                if time.time() - item.checked_at < self.ttl:
+                    self.hits += 1
+                    return item.content
+        return self._flight.do(url, lambda: self._load(url, item))
+
+    def _load(self, url: str, item: Optional[_CachedArticle]) -> Optional[str]:
+        import requests
+        print(f"🚀 Sử dụng `requests` để lấy dữ liệu bài viết: {url}")
+        try:
+            not_modified, content, etag, last_modified = _revalidate_article(
+                url,
+                etag=item.etag if item else None,
+                last_modified=item.last_modified if item else None,
+            )
+        except (requests.RequestException, CircuitOpenError) as e:
+            print(f"❌ Lỗi khi dùng requests cho bài viết: {e}", file=sys.stderr)
+            # Máy chủ lỗi: vẫn trả bản đã cache (nếu có) thay vì báo lỗi.
+            return item.content if item else None
+
+        with self._lock:
+            if not_modified and item is not None:
+                item.checked_at = time.time()
+                item.etag, item.last_modified = etag, last_modified
+                self.revalidated += 1
+                self.hits += 1
+                return item.content
+            self.misses += 1
+
+        if content is None:
+            return None
+        self._store(url, _CachedArticle(content, etag, last_modified))
+        return content
+
+    def _store(self, url: str, item: _CachedArticle):
+        if item.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            self._entries[url] = item
+            self.total_bytes += item.size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted.size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "revalidated": self.revalidated,
+            }
+
+
+article_cache = ArticleCache()
@@ -0,0 +1,261 @@
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Gộp các lời gọi đồng thời cùng một key thành đúng một lần thực thi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+
+    def do(self, key, fn: Callable[[], Any]):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class CacheEntry:
+    __slots__ = ("_value", "_decode", "fetched_at", "stale", "encoded")
+
+    def __init__(self, value: Any, fetched_at: float, stale: bool = False, encoded: Any = None,
+                 decode: Optional[Callable[[], Any]] = None):
+        self._value = value
+        # Khi có `decode`, `value` chỉ được giải mã (từ `encoded`) ở lần đầu cần tới.
+        self._decode = decode
+        self.fetched_at = fetched_at
+        # True khi lần làm mới gần nhất thất bại (hoặc giá trị lấy từ snapshot chưa được xác nhận lại).
+        self.stale = stale
+        # Bản đã mã hoá sẵn của `value` (xem tham số `encode` của SWRCache), hoặc None.
+        self.encoded = encoded
+
+    @property
+    def value(self) -> Any:
+        if self._decode is not None:
+            self._value, self._decode = self._decode(), None
+        return self._value
+
+    def has_value(self) -> bool:
+        """Có dữ liệu không rỗng hay không; không giải mã nếu đã có bản mã hoá (chỉ lưu khi có dữ liệu)."""
+        return self.encoded is not None or bool(self.value)
+
+
+class SWRCache:
+    """
+    Cache stale-while-revalidate cho các nguồn dữ liệu đã đăng ký.
+
+    - Lần đầu (cache lạnh): các request đồng thời cùng key chờ chung một lần tải.
+    - Sau khi hết TTL: vẫn trả giá trị cũ ngay, đồng thời chạy đúng một lần làm mới nền.
+    - Kết quả rỗng (scraper trả [] / None khi lỗi) không ghi đè giá trị đang có;
+      giá trị đó được giữ lại và đánh dấu stale.
+    - Nếu có `store` (SnapshotStore), mỗi lần tải thành công được lưu xuống đĩa và
+      được nạp lại khi khởi động (`load_snapshots`).
+    - `store` dùng chung giữa các worker: trước khi gọi upstream, cache lấy bản mới
+      hơn mà worker khác đã ghi; việc gọi upstream được bảo vệ bằng khoá liên tiến
+      trình nên mỗi key chỉ một worker tải lại.
+    - Nếu có `encode`, mỗi giá trị mới được mã hoá sẵn một lần (ví dụ JSON đã nén) và
+      giữ trong `CacheEntry.encoded`, ngoài luồng xử lý request.
+    - Nếu có thêm `restore`, bản mã hoá được lưu kèm vào `store`; worker khác dựng lại nó
+      bằng `restore(body, etag, variants)` thay vì giải mã rồi mã hoá lại, và chỉ giải mã
+      `value` (qua `decode()` của bản mã hoá) khi thực sự cần.
+    """
+
+    def __init__(self, store=None, namespace: str = "cache", encode: Optional[Callable[[Any], Any]] = None,
+                 restore: Optional[Callable[[bytes, str, Dict[str, bytes]], Any]] = None):
+        self.store = store
+        self.namespace = namespace
+        self.encode = encode
+        self.restore = restore
+        self._sources: Dict[str, Tuple[Callable[[], Any], float]] = {}
+        self._entries: Dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._flight = SingleFlight()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def register(self, key: str, loader: Callable[[], Any], ttl: float):
+        self._sources[key] = (loader, ttl)
+
+    def entry(self, key: str) -> Optional[CacheEntry]:
+        return self._entries.get(key)
+
+    def _new_entry(self, value: Any, fetched_at: float, stale: bool = False) -> CacheEntry:
+        encoded = self.encode(value) if self.encode is not None and value else None
+        return CacheEntry(value, fetched_at, stale, encoded)
+
+    def _store_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _entry_from_store(self, key: str, since: Optional[float] = None) -> Optional[CacheEntry]:
+        """Bản chụp trên đĩa mới hơn `since` (ưu tiên bản đã mã hoá sẵn), hoặc None."""
+        if not self.store:
+            return None
+        _, ttl = self._sources[key]
+        if self.restore is not None:
+            saved = self.store.load_encoded_if_newer(self._store_key(key), since)
+            if saved is not None:
+                body, etag, variants, fetched_at = saved
+                encoded = self.restore(body, etag, variants)
+                return CacheEntry(None, fetched_at, time.time() - fetched_at >= ttl, encoded, decode=encoded.decode)
+        snapshot = self.store.load_if_newer(self._store_key(key), since)
+        if snapshot is None:
+            return None
+        value, fetched_at = snapshot
+        return self._new_entry(value, fetched_at, stale=time.time() - fetched_at >= ttl)
+
+    def load_snapshots(self) -> int:
+        """Nạp bản chụp trên đĩa cho các key chưa có trong bộ nhớ; trả về số key đã nạp."""
+        loaded = 0
+        for key in list(self._sources):
+            if key in self._entries:
+                continue
+            entry = self._entry_from_store(key)
+            if entry is not None and entry.has_value():
+                self._entries[key] = entry
+                loaded += 1
+        return loaded
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        return entry.value if entry else None
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Như `get` nhưng trả về CacheEntry, để dùng `encoded` mà không phải giải mã `value`."""
+        entry = self.entry_if_cached(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            self.misses[key] = self.misses.get(key, 0) + 1
+        return self._flight.do(key, lambda: self._load(key, wait_for_peer=True))
+
+    def keys(self) -> List[str]:
+        return list(self._sources)
+
+    def refresh(self, key: str) -> Optional[CacheEntry]:
+        """Làm mới một key ngay (dùng chung lần tải với các request đang chờ); dùng cho bộ lập lịch."""
+        return self._flight.do(key, lambda: self._load(key))
+
+    def get_if_cached(self, key: str):
+        """Trả giá trị đang có (kể cả đã hết hạn, khi đó làm mới nền) mà không bao giờ chặn; None nếu cache lạnh."""
+        entry = self.entry_if_cached(key)
+        return entry.value if entry is not None else None
+
+    def entry_if_cached(self, key: str) -> Optional[CacheEntry]:
+        """Như `get_if_cached` nhưng trả về CacheEntry."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self.hits[key] = self.hits.get(key, 0) + 1
+        _, ttl = self._sources[key]
+        if time.time() - entry.fetched_at >= ttl:
+            self._refresh_in_background(key)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def _adopt_from_store(self, key: str, current: Optional[CacheEntry]) -> Optional[CacheEntry]:
+        """Dùng bản chụp còn hạn mà worker khác vừa ghi (nếu mới hơn bản đang có)."""
+        entry = self._entry_from_store(key, current.fetched_at if current else None)
+        if entry is None or entry.stale or not entry.has_value():
+            return None
+        self._entries[key] = entry
+        return entry
+
+    def _load(self, key: str, wait_for_peer: bool = False) -> Optional[CacheEntry]:
+        current = self._entries.get(key)
+        adopted = self._adopt_from_store(key, current)
+        if adopted is not None:
+            return adopted
+        if not self.store:
+            return self._fetch(key)
+
+        # Cache lạnh thì không có bản nào để trả tạm, nên luôn chờ worker đang làm mới (kể cả khi
+        # lần tải này do refresh()/làm mới nền khởi động và get() lạnh đang gộp vào nó). Bản đang
+        # có đã stale (nạp từ đĩa sau khi khởi động lại, hoặc lần trước lỗi) cũng không đáng giữ:
+        # chờ kết quả của worker kia thay vì coi bản cũ là kết quả làm mới.
+        blocking = wait_for_peer or current is None or current.stale
+        with self.store.process_lock(self._store_key(key), blocking=blocking) as acquired:
+            # Worker khác có thể vừa làm mới xong trong lúc ta chờ khoá.
+            adopted = self._adopt_from_store(key, current)
+            if adopted is not None:
+                return adopted
+            if not acquired and not blocking:
+                # Worker khác đang làm mới; tiếp tục dùng bản hiện có.
+                return current
+            return self._fetch(key)
+
+    def _fetch(self, key: str) -> Optional[CacheEntry]:
+        loader, _ = self._sources[key]
+        try:
+            value = loader()
+        except Exception as e:
+            print(f"❌ Lỗi khi tải dữ liệu '{key}': {e}", file=sys.stderr)
+            value = None
+
+        if not value:
+            # Upstream lỗi: giữ giá trị cũ (trong bộ nhớ hoặc trên đĩa) và đánh dấu stale.
+            current = self._entries.get(key) or self._entry_from_store(key)
+            if current is not None and current.has_value():
+                current.stale = True
+                self._entries[key] = current
+                return current
+            return None
+
+        entry = self._new_entry(value, time.time())
+        self._entries[key] = entry
+        if self.store:
+            # Chỉ lưu kèm bản mã hoá khi worker khác dựng lại được nó (có `restore`).
+            self.store.save(self._store_key(key), value, entry.fetched_at,
+                            encoded=entry.encoded if self.restore is not None else None)
+        return entry
+
+    def _refresh_in_background(self, key: str):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._background_refresh, args=(key,),
+                         name=f"cache-refresh-{key}", daemon=True).start()
+
+    def _background_refresh(self, key: str):
+        try:
+            self._flight.do(key, lambda: self._load(key))
+        except Exception as e:
+            print(f"❌ Lỗi khi làm mới cache '{key}': {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
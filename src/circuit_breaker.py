@@ -0,0 +1,210 @@
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Mặc định cho mọi upstream; từng upstream có thể ghi đè khi tạo breaker / RetryPolicy.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.2"))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Upstream đang bị ngắt mạch; `retry_after` là số giây tới lần thử lại tiếp theo."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} đang tạm ngưng do lỗi liên tiếp, thử lại sau {math.ceil(retry_after)} giây.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(TimeoutError):
+    """Không còn đủ thời gian tới deadline của lời gọi cho thêm một lần thử upstream."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Không còn đủ thời gian để gọi {name}.")
+        self.name = name
+
+
+_deadline = threading.local()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[None]:
+    """
+    Đặt deadline (mốc time.monotonic()) cho mọi lời gọi breaker trong luồng hiện tại.
+
+    Lồng nhau thì deadline sớm hơn thắng; None giữ nguyên deadline đang có.
+    """
+    previous = current_deadline()
+    if deadline is not None and previous is not None:
+        deadline = min(deadline, previous)
+    _deadline.value = deadline if deadline is not None else previous
+    try:
+        yield
+    finally:
+        _deadline.value = previous
+
+
+def current_deadline() -> Optional[float]:
+    """Deadline của luồng hiện tại (để truyền sang luồng con), None nếu không có."""
+    return getattr(_deadline, "value", None)
+
+
+class RetryPolicy:
+    """
+    Số lần thử tối đa và độ trễ giữa các lần thử: exponential backoff với "full jitter"
+    (ngẫu nhiên trong [0, min(max_delay, base_delay * 2^n)]) để các worker không thử lại cùng lúc.
+    """
+
+    def __init__(self, attempts: int = 3, base_delay: float = RETRY_BASE_DELAY_SECONDS,
+                 max_delay: float = RETRY_MAX_DELAY_SECONDS):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delays(self) -> Iterator[float]:
+        for n in range(self.attempts - 1):
+            yield random.uniform(0, min(self.max_delay, self.base_delay * (2 ** n)))
+
+
+class CircuitBreaker:
+    """
+    Ngắt mạch cho một upstream, dùng chung giữa các thread của tiến trình.
+
+    - closed: mọi lời gọi đi qua; `failure_threshold` lỗi tạm thời liên tiếp thì chuyển sang open.
+    - open: mọi lời gọi bị từ chối ngay bằng CircuitOpenError (không chờ timeout) trong
+      `reset_seconds`; nơi gọi trả dữ liệu đã cache hoặc 503.
+    - half_open: hết thời gian chờ thì cho đúng một lời gọi thử; thành công thì đóng lại,
+      lỗi thì mở tiếp một chu kỳ nữa.
+
+    Chỉ lỗi tạm thời (theo `is_failure` của nơi gọi: timeout, mất kết nối, 5xx...) mới được
+    tính; upstream trả lỗi 4xx nghĩa là nó vẫn hoạt động.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+        self.retries = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def _admit(self):
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_seconds)
+                self._probing = True
+
+    def _release(self):
+        with self._lock:
+            self._probing = False
+
+    def _on_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def _on_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn: Callable[[], Any], is_failure: Callable[[BaseException], bool],
+             retry: Optional[RetryPolicy] = None,
+             before_attempt: Optional[Callable[[Optional[float]], Any]] = None,
+             attempt_timeout: float = 0.0) -> Any:
+        """
+        Gọi `fn` qua breaker, thử lại các lỗi tạm thời theo `retry`.
+
+        `before_attempt(budget)` (ví dụ chờ token hạn mức, giãn cách request) chạy trước mỗi
+        lần thử, sau khi breaker đã cho qua; `budget` là số giây tối đa nó được chờ (None nếu
+        không có deadline). Lỗi của nó được ném thẳng và không tính vào breaker.
+
+        Nếu luồng có deadline (deadline_scope), một lần thử chỉ bắt đầu khi còn ít nhất
+        `attempt_timeout` giây (thời gian tối đa của một lần gọi `fn`): lần đầu thì ném
+        DeadlineExceededError (không tính vào breaker), lần thử lại thì ném lỗi vừa gặp.
+        Không thử lại khi breaker vừa chuyển sang open.
+        """
+        deadline = current_deadline()
+
+        def budget() -> Optional[float]:
+            return None if deadline is None else deadline - time.monotonic() - attempt_timeout
+
+        if deadline is not None and budget() < 0:
+            raise DeadlineExceededError(self.name)
+        delays = retry.delays() if retry is not None else iter(())
+        while True:
+            self._admit()
+            try:
+                if before_attempt is not None:
+                    before_attempt(None if deadline is None else max(0.0, budget()))
+            except BaseException:
+                self._release()
+                raise
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_failure(e):
+                    self._on_success()
+                    raise
+                self._on_failure()
+                delay = next(delays, None)
+                if delay is None or self.state != CLOSED:
+                    raise
+                if deadline is not None and budget() < delay:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(delay)
+                continue
+            self._on_success()
+            return result
+
+    def status(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            retry_after = (max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+                           if state == OPEN else 0.0)
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_after_seconds": round(retry_after, 3),
+                "opened": self.opened,
+                "rejected": self.rejected,
+                "retries": self.retries,
+            }
@@ -1,16 +1,46 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from src.sheets_utils import find_activity_info
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import BaseModel, Field
+from src.upstream import run_sheets
+from src.sheets_utils import activity_index, find_activity_info, find_activity_infos, SheetLookupError
 
 router = APIRouter()
 
+MAX_BATCH_SIZE = 2000
+
 class LookupRequest(BaseModel):
     fullName: str
     citizenId: str
 
+class BatchLookupRequest(BaseModel):
+    items: List[LookupRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+def _mark_stale(response: Response):
+    snapshot = activity_index.snapshot
+    if snapshot is not None and snapshot.stale:
+        response.headers["X-Data-Stale"] = "true"
+        response.headers["X-Data-Fetched-At"] = str(int(snapshot.built_at))
+
 @router.post("/find-activities")
-def find_activities(request: LookupRequest):
-    activity = find_activity_info(request.fullName, request.citizenId)
+async def find_activities(request: LookupRequest, response: Response):
+    try:
+        activity = await run_sheets(find_activity_info, request.fullName, request.citizenId)
+    except SheetLookupError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    _mark_stale(response)
     if not activity:
         raise HTTPException(status_code=404, detail="Không tìm thấy hoạt động.")
     return {"activities": [activity]}
+
+@router.post("/find-activities/batch")
+async def find_activities_batch(request: BatchLookupRequest, response: Response):
+    try:
+        matches = await run_sheets(find_activity_infos, [(item.fullName, item.citizenId) for item in request.items])
+    except SheetLookupError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    _mark_stale(response)
+    return {"results": [
+        {"fullName": item.fullName, "citizenId": item.citizenId, "found": bool(rows), "activities": rows}
+        for item, rows in zip(request.items, matches)
+    ]}
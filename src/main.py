@@ -1,30 +1,57 @@
+import math
 import os
+import threading
 import time
-from typing import List, Dict, Any
 
-from fastapi import FastAPI, HTTPException, Body
+# Import trước mọi module khác để đo được thời gian import của chính API.
+from src.startup import startup_timer
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 
 # --- SCRAPER MODULE ---
 from scraper import scrape_news as fetch_news_from_source
-from scraper import scrape_article_with_requests as fetch_article_from_source
 from scraper import (
+    scrape_news_incremental,
     scrape_chuong_trinh_chien_dich_du_an,
     scrape_skills,
     scrape_ideas,
     scrape_clubs,
     BASE_URL,
+    govolunteer_breaker,
 )
 
 # --- ROUTER MODULES ---
 from src.find_activities import router as activities_router
 from src.find_certificate import router as certificates_router
 from src.request_pdf import router as pdf_router
+from src.all_data import router as all_data_router
+from src.admin_search import router as admin_search_router
+from src.sheets_client import sheets_breaker, sheets_clients, sheets_read_quota, sheets_write_quota
+from src.quota import QuotaExceededError
+from src.circuit_breaker import CircuitOpenError, CLOSED, HALF_OPEN, OPEN
+from src.sheets_utils import (
+    pdf_request_queue, activity_index, certificate_index, activity_search, certificate_search,
+)
+from src.snapshot_store import snapshot_store
+from src.scheduler import RefreshScheduler
+from src.sheet_index import SHEET_INDEX_REFRESH_SECONDS
+from src.cache import SWRCache
+from src.payload import EncodedPayload, payload_response
+from src.article_cache import article_cache
+from src.upstream import pool_stats, run_scrape
+from src.metrics import (
+    registry as metrics_registry, instrument_upstream, MetricsMiddleware,
+    CACHE_REQUESTS, CACHE_ENTRIES, CACHE_BYTES, POOL_BORROWED, POOL_CAPACITY, QUOTA_TOKENS, QUOTA_REJECTED,
+    STARTUP_PHASE_DURATION, CIRCUIT_STATE, CIRCUIT_REJECTED,
+)
+
+# googleapiclient, google.oauth2, requests và bs4 chỉ được import ở lần dùng đầu tiên,
+# nên giai đoạn này chỉ gồm FastAPI và mã của chính API.
+startup_timer.mark("import", startup_timer.created)
+_app_setup_started = time.perf_counter()
 
 # ==========================================================================
 # --- 1. INIT APP & CORS ---
@@ -42,125 +69,251 @@ app.add_middleware(
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(QuotaExceededError)
+async def quota_exceeded_handler(request: Request, exc: QuotaExceededError):
+    # Hết hạn mức upstream: từ chối nhanh để client thử lại sau, thay vì chờ rồi lỗi 504.
+    return JSONResponse(status_code=429, content={"detail": str(exc)},
+                        headers={"Retry-After": str(math.ceil(exc.retry_after))})
+
+# Breaker của từng upstream (nhãn trong /metrics -> breaker).
+CIRCUIT_BREAKERS = {"govolunteer": govolunteer_breaker, "sheets": sheets_breaker}
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # Upstream đang ngắt mạch và không có dữ liệu cache để trả: báo lỗi ngay, không chờ timeout.
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": str(math.ceil(exc.retry_after))})
 
 # ==========================================================================
 # --- 2. GOOGLE SHEETS SETUP ---
 # ==========================================================================
-SERVICE_ACCOUNT_FILE = 'credentials.json'
-SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
-ACTIVITY_SHEET_ID = '1BGbTI34I8H_cZaRey5UHuPkxZa1bMsk1JanXCZFdj3s'
-CERTIFICATE_SHEET_ID = '1uAVk9XZExLgCdfukYGxk8NSFh5CZtrfjS0gQtxjTQaQ'
-SHEET_NAME = 'Sheet1'
-
-sheet_api = None
-
-@app.on_event("startup")
-def startup_event():
-    global sheet_api
+def _warm_up_sheets():
     print("🔧 Khởi tạo Google Sheets API...")
     try:
-        if os.path.exists(SERVICE_ACCOUNT_FILE):
-            creds = service_account.Credentials.from_service_account_file(
-                SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-            service = build('sheets', 'v4', credentials=creds)
-            sheet_api = service.spreadsheets()
-            print("✅ Kết nối Google Sheets thành công.")
-        else:
-            print(f"❌ Không tìm thấy file: {SERVICE_ACCOUNT_FILE}")
+        with startup_timer.phase("sheets_warm_up", background=True):
+            sheets_clients.warm_up()
+        print("✅ Kết nối Google Sheets thành công.")
     except Exception as e:
         print(f"❌ Lỗi khi khởi tạo Google Sheets API: {e}")
 
+@app.on_event("startup")
+def startup_event():
+    # Discovery đóng gói sẵn + credentials được nạp nền: worker nhận request ngay,
+    # lời gọi Sheets đầu tiên (nếu đến sớm hơn) tự nạp như bình thường.
+    if sheets_clients.is_available():
+        threading.Thread(target=_warm_up_sheets, name="sheets-warm-up", daemon=True).start()
+    else:
+        print(f"❌ Không tìm thấy file: {sheets_clients.service_account_file}")
+    # Ghi nốt các yêu cầu /request-pdf còn trong hàng đợi từ lần chạy trước.
+    with startup_timer.phase("pdf_queue"):
+        pdf_request_queue.start()
+    with startup_timer.phase("scheduler_setup"):
+        _setup_refresh_scheduler()
+    # Nạp bản chụp trên đĩa để phục vụ ngay sau khi khởi động lại; dữ liệu mới được tải nền.
+    with startup_timer.phase("load_snapshots"):
+        loaded = scraper_cache.load_snapshots()
+        for index in (activity_index, certificate_index):
+            if index.load_snapshot():
+                loaded += 1
+    print(f"💾 Đã nạp {loaded} bản chụp dữ liệu từ {snapshot_store.path}.")
+    with startup_timer.phase("scheduler_start"):
+        refresh_scheduler.start()
+    startup_timer.ready()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    refresh_scheduler.stop()
+
 # ==========================================================================
 # --- 3. SCRAPER ENDPOINTS ---
 # ==========================================================================
-cache = {"news_data": None, "last_fetched": 0}
-CACHE_DURATION_SECONDS = 1800  # 30 phút
+# TTL (giây) cho từng endpoint; hết hạn thì vẫn trả dữ liệu cũ và làm mới nền.
+CACHE_TTLS = {
+    "news": 1800,  # 30 phút
+    "clubs": 3600,
+    "chuong-trinh-chien-dich-du-an": 3600,
+    "skills": 3600,
+    "ideas": 3600,
+}
+
+def _scraper_loader(fn):
+    # Scraper trả [] / None khi lỗi mạng, nên kết quả rỗng cũng được đếm là lỗi upstream.
+    return instrument_upstream("govolunteer", fn.__name__, fn, empty_is_error=True)
+
+# Mỗi lần dữ liệu đổi, JSON + bản gzip/brotli + ETag được tạo sẵn một lần cho mọi request sau đó.
+# /news được làm mới tăng dần (thường chỉ tải trang 1); định kỳ cào lại toàn bộ để bắt bài bị sửa/xoá.
+NEWS_FULL_CRAWL_SECONDS = int(os.getenv("NEWS_FULL_CRAWL_SECONDS", str(6 * 3600)))
+_NEWS_FULL_CRAWL_KEY = "scrape-meta:news-full-crawl"
+_scrape_news_full = _scraper_loader(fetch_news_from_source)
+_scrape_news_incremental = _scraper_loader(scrape_news_incremental)
+
+def _load_news():
+    entry = scraper_cache.entry("news")
+    # Thời điểm cào toàn bộ gần nhất nằm trong snapshot store để mọi worker dùng chung.
+    last_full = snapshot_store.load(_NEWS_FULL_CRAWL_KEY)
+    if (entry is None or not entry.value or last_full is None
+            or time.time() - last_full[1] >= NEWS_FULL_CRAWL_SECONDS):
+        data = _scrape_news_full()
+        if data:
+            snapshot_store.save(_NEWS_FULL_CRAWL_KEY, True, time.time())
+        return data
+    return _scrape_news_incremental(entry.value)
+
+scraper_cache = SWRCache(store=snapshot_store, namespace="scrape", encode=EncodedPayload,
+                         restore=EncodedPayload.restore)
+scraper_cache.register("news", _load_news, CACHE_TTLS["news"])
+scraper_cache.register("clubs", _scraper_loader(scrape_clubs), CACHE_TTLS["clubs"])
+scraper_cache.register("chuong-trinh-chien-dich-du-an", _scraper_loader(scrape_chuong_trinh_chien_dich_du_an),
+                       CACHE_TTLS["chuong-trinh-chien-dich-du-an"])
+scraper_cache.register("skills", _scraper_loader(scrape_skills), CACHE_TTLS["skills"])
+scraper_cache.register("ideas", _scraper_loader(scrape_ideas), CACHE_TTLS["ideas"])
+
+# ==========================================================================
+# --- LÀM MỚI NỀN: làm nóng lúc khởi động và làm mới định kỳ ngoài luồng request ---
+# ==========================================================================
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+# Làm mới trước khi TTL hết hạn để request không bao giờ thấy dữ liệu quá hạn.
+REFRESH_INTERVALS = {key: ttl * 0.8 for key, ttl in CACHE_TTLS.items()}
+
+refresh_scheduler = RefreshScheduler()
+
+def _refresh_scraper_job(key: str):
+    def job():
+        entry = scraper_cache.refresh(key)
+        if entry is None or entry.stale:
+            raise RuntimeError(f"Không lấy được dữ liệu mới cho '{key}'.")
+    return job
+
+def _refresh_sheet_job(index, search):
+    def job():
+        index.scheduled_refresh()
+        # Dựng sẵn chỉ mục tìm kiếm theo tên cho dữ liệu mới.
+        search.current()
+    return job
+
+def _setup_refresh_scheduler():
+    if not SCHEDULER_ENABLED:
+        return
+    for key in scraper_cache.keys():
+        refresh_scheduler.add_job(f"scrape:{key}", _refresh_scraper_job(key), REFRESH_INTERVALS[key])
+    if sheets_clients.is_available():
+        for name, index, search in (("activities", activity_index, activity_search),
+                                    ("certificates", certificate_index, certificate_search)):
+            index.auto_refresh = False
+            refresh_scheduler.add_job(f"sheet:{name}", _refresh_sheet_job(index, search), SHEET_INDEX_REFRESH_SECONDS)
+
+@app.get("/scheduler/jobs")
+async def get_scheduler_jobs():
+    return refresh_scheduler.status()
+
+@app.get("/circuit-breakers")
+async def get_circuit_breakers():
+    return [breaker.status() for breaker in CIRCUIT_BREAKERS.values()]
+
+@app.get("/startup")
+async def get_startup_report():
+    return startup_timer.report()
+
+async def _cached_response(key: str, request: Request, error_detail: str) -> Response:
+    # Cache đã có dữ liệu thì trả ngay trên event loop; chỉ khi cache lạnh mới chiếm pool scrape.
+    # Chỉ dùng bản đã mã hoá sẵn, nên không cần giải mã `value` (ví dụ bản vừa nhận từ worker khác).
+    entry = scraper_cache.entry_if_cached(key)
+    if entry is None:
+        entry = await run_scrape(scraper_cache.get_entry, key)
+    if entry is None or entry.encoded is None:
+        raise HTTPException(status_code=503, detail=error_detail)
+    headers = {}
+    if entry.stale:
+        # Upstream đang lỗi: trả bản cũ kèm cờ stale thay vì 503.
+        headers["X-Data-Stale"] = "true"
+        headers["X-Data-Fetched-At"] = str(int(entry.fetched_at))
+    return payload_response(entry.encoded, request, headers)
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"status": "online", "message": "API GoVolunteer hoạt động"}
 
 @app.get("/news")
-def get_all_news():
-    current_time = time.time()
-    if cache["news_data"] and (current_time - cache["last_fetched"] < CACHE_DURATION_SECONDS):
-        return cache["news_data"]
-    data = fetch_news_from_source()
-    if not data:
-        raise HTTPException(status_code=503, detail="Không thể lấy dữ liệu tin tức.")
-    cache["news_data"] = data
-    cache["last_fetched"] = current_time
-    return data
+async def get_all_news(request: Request):
+    return await _cached_response("news", request, "Không thể lấy dữ liệu tin tức.")
 
 @app.get("/clubs")
-def get_clubs():
-    data = scrape_clubs()
-    if not data:
-        raise HTTPException(status_code=503, detail="Không thể lấy dữ liệu CLB.")
-    return data
+async def get_clubs(request: Request):
+    return await _cached_response("clubs", request, "Không thể lấy dữ liệu CLB.")
 
 @app.get("/chuong-trinh-chien-dich-du-an")
-def get_campaigns():
-    data = scrape_chuong_trinh_chien_dich_du_an()
-    if not data:
-        raise HTTPException(status_code=503, detail="Không thể lấy dữ liệu chương trình.")
-    return data
+async def get_campaigns(request: Request):
+    return await _cached_response("chuong-trinh-chien-dich-du-an", request, "Không thể lấy dữ liệu chương trình.")
 
 @app.get("/skills")
-def get_skills():
-    data = scrape_skills()
-    if not data:
-        raise HTTPException(status_code=503, detail="Không thể lấy dữ liệu kỹ năng.")
-    return data
+async def get_skills(request: Request):
+    return await _cached_response("skills", request, "Không thể lấy dữ liệu kỹ năng.")
 
 @app.get("/ideas")
-def get_ideas():
-    data = scrape_ideas()
-    if not data:
-        raise HTTPException(status_code=503, detail="Không thể lấy dữ liệu ý tưởng.")
-    return data
+async def get_ideas(request: Request):
+    return await _cached_response("ideas", request, "Không thể lấy dữ liệu ý tưởng.")
 
 @app.get("/article")
-def get_article_detail(url: str):
+async def get_article_detail(url: str):
     if not url or not url.startswith(BASE_URL):
         raise HTTPException(status_code=400, detail=f"URL phải bắt đầu bằng {BASE_URL}")
-    content = fetch_article_from_source(url)
+    content = await run_scrape(article_cache.get, url)
     if content is None:
         raise HTTPException(status_code=503, detail="Không thể lấy nội dung bài viết.")
     return {"html_content": content}
 
+@app.get("/article/cache-stats")
+async def get_article_cache_stats():
+    return article_cache.stats()
+
 # ==========================================================================
-# --- 4. ADMIN TOOLS: XEM TOÀN BỘ DỮ LIỆU ---
+# --- METRICS (Prometheus) ---
 # ==========================================================================
-def _get_all_sheet_data(spreadsheet_id: str) -> Dict[str, Any]:
-    if not sheet_api:
-        raise HTTPException(status_code=503, detail="Google Sheets API không khả dụng.")
-    try:
-        result = sheet_api.values().get(spreadsheetId=spreadsheet_id, range=SHEET_NAME).execute()
-        values = result.get("values", [])
-        if not values or len(values) < 2:
-            return {"count": 0, "headers": values[0] if values else [], "data": []}
-        headers = values[0]
-        records = [
-            {headers[i]: (row[i] if i < len(row) else "") for i in range(len(headers))}
-            for row in values[1:]
-        ]
-        return {"count": len(records), "headers": headers, "data": records}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def _cache_request_samples():
+    stats = scraper_cache.stats()
+    samples = [(("scrape", key, "hit"), count) for key, count in stats["hits"].items()]
+    samples += [(("scrape", key, "miss"), count) for key, count in stats["misses"].items()]
+    article = article_cache.stats()
+    samples += [(("article", "", "hit"), article["hits"]), (("article", "", "miss"), article["misses"])]
+    return samples
+
+def _cache_entry_samples():
+    samples = [(("scrape",), scraper_cache.stats()["entries"]), (("article",), article_cache.stats()["entries"])]
+    for name, index in (("sheet:activities", activity_index), ("sheet:certificates", certificate_index)):
+        snapshot = index.snapshot
+        samples.append(((name,), len(snapshot.rows) if snapshot is not None else 0))
+    return samples
 
-@app.get("/all-data")
-def get_all_data_for_auditing():
-    activities = _get_all_sheet_data(ACTIVITY_SHEET_ID)
-    certificates = _get_all_sheet_data(CERTIFICATE_SHEET_ID)
-    return {
-        "activities": activities,
-        "certificates": certificates
-    }
+CACHE_REQUESTS.add_collector(_cache_request_samples)
+CACHE_ENTRIES.add_collector(_cache_entry_samples)
+CACHE_BYTES.add_collector(lambda: [(("article",), article_cache.stats()["bytes"])])
+POOL_BORROWED.add_collector(lambda: [((pool,), used) for pool, (used, _) in pool_stats().items()])
+POOL_CAPACITY.add_collector(lambda: [((pool,), total) for pool, (_, total) in pool_stats().items()])
+QUOTA_TOKENS.add_collector(lambda: [(("sheets_read",), sheets_read_quota.available),
+                                    (("sheets_write",), sheets_write_quota.available)])
+QUOTA_REJECTED.add_collector(lambda: [(("sheets_read",), sheets_read_quota.rejected),
+                                      (("sheets_write",), sheets_write_quota.rejected)])
+CIRCUIT_STATE.add_collector(
+    lambda: [((name,), CIRCUIT_STATE_VALUES[breaker.state]) for name, breaker in CIRCUIT_BREAKERS.items()])
+CIRCUIT_REJECTED.add_collector(lambda: [((name,), breaker.rejected) for name, breaker in CIRCUIT_BREAKERS.items()])
+STARTUP_PHASE_DURATION.add_collector(
+    lambda: [((p["phase"],), p["seconds"]) for p in startup_timer.report()["phases"]])
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # Xuất trên event loop: pool_stats() cần đọc limiter của anyio.
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # ==========================================================================
-# --- 5. INCLUDE ROUTERS (TÁCH MODULE) ---
+# --- 4. INCLUDE ROUTERS (TÁCH MODULE) ---
 # ==========================================================================
 app.include_router(activities_router)
 app.include_router(certificates_router)
 app.include_router(pdf_router)
+app.include_router(all_data_router)
+app.include_router(admin_search_router)
+
+startup_timer.mark("app_setup", _app_setup_started)
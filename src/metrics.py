@@ -0,0 +1,251 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Mốc histogram (giây): từ request trả thẳng từ cache (vài ms) tới lần scrape toàn bộ tin tức.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+# Một collector trả về các mẫu (giá trị nhãn, giá trị) cho một gauge, được gọi lúc xuất /metrics.
+Collector = Callable[[], Sequence[Tuple[LabelValues, float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = self._header()
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Mỗi bộ nhãn: [số mẫu theo từng mốc (không cộng dồn) + ô +Inf, tổng, số mẫu].
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = self._header()
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Gauge đọc giá trị lúc xuất (từ bộ đếm sẵn có của cache, pool...), nên không tốn gì trên đường request."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._collectors: List[Collector] = []
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for collector in self._collectors:
+            for labels, value in collector():
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class CollectedCounter(Gauge):
+    """Như `Gauge` nhưng là bộ đếm tăng dần do đối tượng khác tự giữ (ví dụ hits/misses của cache)."""
+
+    kind = "counter"
+
+
+class Registry:
+    """
+    Tập các metric của tiến trình, xuất ở định dạng văn bản của Prometheus.
+
+    Ghi nhận chỉ là cộng vài số dưới một lock nên có thể bật thường trực. Mỗi worker
+    gunicorn giữ bộ đếm riêng (giống như cache trong bộ nhớ của nó).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # Một collector lỗi không được làm hỏng cả trang metrics.
+                lines.append(f"# {metric.name} không thu thập được: {_escape(str(e))}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Thời gian xử lý request theo route.", ("method", "route", "status"))
+UPSTREAM_REQUEST_DURATION = registry.histogram(
+    "upstream_request_duration_seconds",
+    "Thời gian gọi upstream, theo hàm scraper hoặc spreadsheet ID.", ("upstream", "target"))
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total", "Số lời gọi upstream thất bại, theo hàm scraper hoặc spreadsheet ID.",
+    ("upstream", "target"))
+CACHE_REQUESTS = registry.register(CollectedCounter(
+    "cache_requests_total", "Số lần đọc cache theo kết quả (hit/miss).", ("cache", "key", "result")))
+CACHE_ENTRIES = registry.gauge("cache_entries", "Số mục đang có trong cache.", ("cache",))
+CACHE_BYTES = registry.gauge("cache_bytes", "Dung lượng (byte) đang dùng của cache có giới hạn theo byte.", ("cache",))
+POOL_BORROWED = registry.gauge("threadpool_borrowed_threads", "Số luồng đang bận trong từng pool.", ("pool",))
+POOL_CAPACITY = registry.gauge("threadpool_capacity_threads", "Số luồng tối đa của từng pool.", ("pool",))
+QUOTA_TOKENS = registry.gauge("quota_tokens_available", "Số token còn lại trong hạn mức upstream (âm là đang xếp hàng).",
+                              ("bucket",))
+QUOTA_REJECTED = registry.register(CollectedCounter(
+    "quota_rejected_total", "Số lời gọi bị từ chối vì vượt hạn mức upstream.", ("bucket",)))
+CIRCUIT_STATE = registry.gauge("circuit_breaker_state", "Trạng thái circuit breaker: 0 closed, 1 half-open, 2 open.",
+                               ("upstream",))
+CIRCUIT_REJECTED = registry.register(CollectedCounter(
+    "circuit_breaker_rejected_total", "Số lời gọi bị từ chối ngay vì breaker đang mở.", ("upstream",)))
+STARTUP_PHASE_DURATION = registry.gauge("startup_phase_seconds", "Thời gian từng giai đoạn khởi động của worker.",
+                                        ("phase",))
+
+
+@contextmanager
+def track_upstream(upstream: str, target: str) -> Iterator[None]:
+    """Đo thời gian một lời gọi upstream; lỗi (exception) được đếm vào upstream_errors_total."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        UPSTREAM_ERRORS.inc(upstream, target)
+        raise
+    finally:
+        UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - started, upstream, target)
+
+
+def instrument_upstream(upstream: str, target: str, fn: Callable[..., Any], empty_is_error: bool = False):
+    """
+    Bọc một hàm gọi upstream bằng `track_upstream`. Với `empty_is_error`, kết quả rỗng cũng
+    được tính là lỗi (các scraper nuốt lỗi mạng và trả [] / None).
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with track_upstream(upstream, target):
+            result = fn(*args, **kwargs)
+        if empty_is_error and not result:
+            UPSTREAM_ERRORS.inc(upstream, target)
+        return result
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware đo thời gian mỗi request, gắn nhãn theo mẫu route (`/all-data/{sheet}`)
+    thay vì đường dẫn thật để số chuỗi nhãn không tăng theo tham số.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, scope["method"], route_path, str(status["code"]))
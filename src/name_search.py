@@ -0,0 +1,167 @@
+import bisect
+import re
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from src.sheet_index import IndexSnapshot, SheetIndex
+
+_SPACES = re.compile(r"\s+")
+
+
+def fold_name(text: str) -> str:
+    """
+    Chuẩn hoá tên để so khớp không phân biệt dấu: NFD rồi bỏ dấu, đ/Đ -> d, chữ thường,
+    gộp khoảng trắng. Ví dụ "  Nguyễn   Văn Đức " -> "nguyen van duc".
+    """
+    decomposed = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return _SPACES.sub(" ", stripped).strip().lower()
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchHit(NamedTuple):
+    name: str
+    record: Dict[str, Any]
+
+
+class NameSearchIndex:
+    """
+    Chỉ mục tìm kiếm theo tên trên một bản IndexSnapshot, dựng một lần cho mỗi bản.
+
+    Các dòng được đánh số lại theo thứ tự tên đã fold, nên kết quả chỉ cần sắp xếp số
+    nguyên và các tên bắt đầu bằng query là một đoạn liên tiếp tìm được bằng bisect.
+
+    - `names`: tên đã fold, đã sắp xếp; `records[i]` là dòng tương ứng.
+    - `tokens`: danh sách (từ, số dòng) đã sắp xếp, để tìm theo tiền tố của một từ.
+    - `cccds`: danh sách (CCCD, số dòng) đã sắp xếp, cho truy vấn chỉ gồm chữ số.
+    - `trigrams`: trigram -> các số dòng chứa nó (array tăng dần); truy vấn lấy giao của
+      các danh sách ngắn nhất rồi kiểm tra lại trên tên, nên không quét lại cả sheet.
+    """
+
+    def __init__(self, snapshot: IndexSnapshot, cache_size: int = 64):
+        self.built_at = snapshot.built_at
+        rows = [(fold_name(record.get("User_Name", "")), order, record)
+                for order, record in enumerate(r for matches in snapshot.rows.values() for r in matches)]
+        rows.sort(key=lambda item: (item[0], item[1]))
+        self.names: List[str] = [name for name, _, _ in rows]
+        self.records: List[Dict[str, Any]] = [record for _, _, record in rows]
+
+        tokens: List[Tuple[str, int]] = []
+        trigrams: Dict[str, array] = {}
+        for row, name in enumerate(self.names):
+            tokens.extend((token, row) for token in set(name.split()))
+            # Đệm khoảng trắng hai đầu để trigram biểu diễn được ranh giới từ.
+            for gram in _trigrams(f" {name} "):
+                postings = trigrams.get(gram)
+                if postings is None:
+                    postings = trigrams[gram] = array("I")
+                postings.append(row)
+        tokens.sort()
+        self.tokens = tokens
+        self.cccds = sorted((str(record.get("CCCD", "")).strip(), row) for row, record in enumerate(self.records))
+        self.trigrams = trigrams
+        # Admin thường lật nhiều trang của cùng một truy vấn: giữ kết quả của vài truy vấn gần nhất.
+        self._cache: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _prefix_rows(entries: List[Tuple[str, int]], prefix: str) -> List[int]:
+        """Số dòng của các mục có khoá bắt đầu bằng `prefix`, theo thứ tự khoá."""
+        lo = bisect.bisect_left(entries, (prefix, -1))
+        hi = bisect.bisect_left(entries, (prefix + "\uffff", -1), lo)
+        return [row for _, row in entries[lo:hi]]
+
+    def _trigram_rows(self, text: str) -> set:
+        postings = sorted((self.trigrams.get(gram, ()) for gram in _trigrams(text)), key=len)
+        rows = set(postings[0])
+        for posting in postings[1:]:
+            if not rows:
+                break
+            rows.intersection_update(posting)
+        return rows
+
+    def _name_prefix_range(self, q: str) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.names, q)
+        hi = bisect.bisect_left(self.names, q + "\uffff", lo)
+        return lo, hi
+
+    def search(self, query: str, mode: str = "prefix") -> List[int]:
+        """
+        Các số dòng khớp `query` (đã fold): các tên bắt đầu bằng query (trùng khớp đứng đầu)
+        trước, sau đó các tên khớp khác; trong mỗi nhóm theo thứ tự tên.
+
+        - mode="prefix": query là tiền tố tính từ đầu một từ bất kỳ ("van d" khớp "nguyen van duc").
+        - mode="contains": query nằm ở bất kỳ đâu trong tên (truy vấn dưới 3 ký tự dùng như prefix).
+        - Query chỉ gồm chữ số được tra theo CCCD (tiền tố, hoặc chuỗi con với mode="contains").
+        """
+        q = fold_name(query)
+        if not q:
+            return []
+        key = (q, mode)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        result = self._search(q, mode)
+        with self._cache_lock:
+            self._cache[key] = result
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _search(self, q: str, mode: str) -> List[int]:
+        if q.isdigit():
+            if mode == "contains":
+                return sorted(row for cccd, row in self.cccds if q in cccd)
+            return self._prefix_rows(self.cccds, q)
+
+        names = self.names
+        if mode == "contains" and len(q) >= 3:
+            matches = [row for row in self._trigram_rows(q) if q in names[row]]
+        elif " " not in q:
+            # Một từ: tiền tố của từ đã là điều kiện khớp, không cần kiểm tra lại.
+            matches = list(set(self._prefix_rows(self.tokens, q)))
+        else:
+            padded = f" {q}"
+            matches = [row for row in self._trigram_rows(padded) if padded in f" {names[row]}"]
+
+        lo, hi = self._name_prefix_range(q)
+        result = list(range(lo, hi))
+        if len(matches) > hi - lo:
+            rest = [row for row in matches if not lo <= row < hi]
+            rest.sort()
+            result += rest
+        return result
+
+    def hit(self, row: int) -> SearchHit:
+        return SearchHit(self.names[row], self.records[row])
+
+
+class SheetNameSearch:
+    """Giữ NameSearchIndex của bản chỉ mục hiện tại; dựng lại khi SheetIndex có bản mới."""
+
+    def __init__(self, index: SheetIndex):
+        self.index = index
+        self._search: Optional[NameSearchIndex] = None
+        # Chỉ dựng lại khi dữ liệu đổi; bản chỉ mục chỉ đổi cờ stale vẫn dùng chung `rows`.
+        self._rows = None
+        self._lock = threading.Lock()
+
+    def current(self) -> NameSearchIndex:
+        """Chỉ mục tìm kiếm của dữ liệu hiện tại; gọi sau mỗi lần làm mới nền để dựng trước."""
+        snapshot = self.index.ensure_ready()
+        if self._rows is not snapshot.rows:
+            with self._lock:
+                if self._rows is not snapshot.rows:
+                    self._search = NameSearchIndex(snapshot)
+                    self._rows = snapshot.rows
+        return self._search
@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # orjson không có: dùng json chuẩn, chậm hơn nhưng cùng kết quả.
+    orjson = None
+    import json
+
+try:
+    import brotli
+except ImportError:  # Không có brotli thì chỉ phục vụ gzip.
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(body: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class EncodedPayload:
+    """
+    Một giá trị đã được tuần tự hoá sẵn thành JSON cùng các bản nén gzip/brotli và ETag
+    (băm nội dung). Được tạo một lần mỗi khi dữ liệu thay đổi, nên request chỉ còn chọn
+    bản phù hợp để gửi đi.
+    """
+
+    __slots__ = ("body", "variants", "etag")
+
+    def __init__(self, value: Any):
+        self.body = dumps(value)
+        # ETag yếu: mọi bản nén đều tương đương về nội dung với cùng một JSON.
+        self.etag = f'W/"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+        self.variants: Dict[str, bytes] = {"gzip": gzip.compress(self.body, GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+
+    @classmethod
+    def restore(cls, body: bytes, etag: str, variants: Dict[str, bytes]) -> "EncodedPayload":
+        """Dựng lại từ các phần worker khác đã lưu (SnapshotStore), không mã hoá hay nén lại."""
+        payload = cls.__new__(cls)
+        payload.body = body
+        payload.etag = etag
+        payload.variants = variants
+        return payload
+
+    def decode(self) -> Any:
+        return loads(self.body)
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # So sánh yếu (RFC 9110): bỏ tiền tố W/ ở cả hai phía.
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def payload_response(payload: EncodedPayload, request: Request, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Trả 304 nếu If-None-Match khớp, không thì bản nén tốt nhất mà client chấp nhận."""
+    response_headers = {"ETag": payload.etag, "Vary": "Accept-Encoding", **(headers or {})}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, payload.etag):
+        return Response(status_code=304, headers=response_headers)
+
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    for coding in ("br", "gzip"):
+        variant = payload.variants.get(coding)
+        if variant is not None and accepted.get(coding, 0) > 0:
+            response_headers["Content-Encoding"] = coding
+            return Response(content=variant, media_type="application/json", headers=response_headers)
+    return Response(content=payload.body, media_type="application/json", headers=response_headers)
@@ -0,0 +1,204 @@
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có khoá giữa các tiến trình.
+    fcntl = None
+
+from googleapiclient.errors import HttpError
+
+from src.circuit_breaker import CircuitOpenError
+from src.quota import QuotaExceededError
+from src.sheet_index import normalize_key
+
+# Hàng đợi cục bộ (SQLite) cho các yêu cầu /request-pdf chưa ghi lên Google Sheet.
+PDF_QUEUE_DB = os.getenv("PDF_QUEUE_DB", "pdf_requests.db")
+PDF_QUEUE_FLUSH_SECONDS = float(os.getenv("PDF_QUEUE_FLUSH_SECONDS", "2"))
+PDF_QUEUE_BATCH_SIZE = int(os.getenv("PDF_QUEUE_BATCH_SIZE", "500"))
+PDF_QUEUE_MAX_ATTEMPTS = int(os.getenv("PDF_QUEUE_MAX_ATTEMPTS", "10"))
+PDF_QUEUE_MAX_BACKOFF_SECONDS = 300
+
+FlushFn = Callable[[List[Tuple[str, str, str]]], List[bool]]
+
+
+class PdfRequestQueue:
+    """
+    Hàng đợi ghi-sau (write-behind) cho cột Email / PDF_Requested của sheet chứng nhận.
+
+    `enqueue` chỉ ghi một dòng vào SQLite (bền vững qua restart) rồi trả về ngay.
+    Một thread nền gom các yêu cầu đang chờ, gộp yêu cầu lặp lại của cùng một người
+    (giữ email mới nhất) và ghi tất cả bằng `flush_fn` trong một lần batchUpdate.
+    Lỗi (kể cả hết quota) được thử lại với backoff luỹ thừa có jitter; vì giá trị ghi
+    là idempotent nên ghi lặp lại sau khi thử lại là an toàn.
+
+    Mọi worker gunicorn dùng chung file SQLite; một khoá file (flock) cạnh file đó bảo
+    đảm mỗi lúc chỉ một worker đọc và ghi một lô, để hai worker không ghi trùng cùng các dòng (tốn hạn mức)
+    và một lô cũ không ghi đè email mới hơn mà worker khác vừa ghi.
+    """
+
+    def __init__(self, flush_fn: FlushFn, path: str = PDF_QUEUE_DB,
+                 flush_seconds: float = PDF_QUEUE_FLUSH_SECONDS,
+                 batch_size: int = PDF_QUEUE_BATCH_SIZE,
+                 max_attempts: int = PDF_QUEUE_MAX_ATTEMPTS):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._flush_fn = flush_fn
+        self._wakeup = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pdf_requests ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " full_name TEXT NOT NULL,"
+                " citizen_id TEXT NOT NULL,"
+                " email TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def enqueue(self, full_name: str, citizen_id: str, email: str):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO pdf_requests (full_name, citizen_id, email, created_at) VALUES (?, ?, ?, ?)",
+                    (full_name, citizen_id, email, time.time()))
+        finally:
+            conn.close()
+        self.start()
+        self._wakeup.set()
+
+    def pending_count(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM pdf_requests").fetchone()[0]
+        finally:
+            conn.close()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="pdf-request-writer", daemon=True)
+                self._thread.start()
+
+    def flush_once(self) -> int:
+        """
+        Ghi một lô yêu cầu đang chờ; trả về số yêu cầu đã xử lý. Ném lỗi nếu ghi thất bại.
+        Nếu worker khác đang ghi thì trả về 0 và hẹn thử lại sau một nhịp.
+        """
+        with self._flush_lock() as acquired:
+            if not acquired:
+                # Worker đang giữ khoá có thể đã đọc lô trước khi yêu cầu mới của worker này vào hàng.
+                self._wakeup.set()
+                return 0
+            return self._flush_batch()
+
+    @contextmanager
+    def _flush_lock(self) -> Iterator[bool]:
+        """Khoá ghi giữa các tiến trình (flock, không chờ); True nếu giữ được khoá."""
+        if fcntl is None:
+            yield True
+            return
+        with open(f"{self.path}.lock", "a") as handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _flush_batch(self) -> int:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, full_name, citizen_id, email FROM pdf_requests ORDER BY id LIMIT ?",
+                (self.batch_size,)).fetchall()
+            if not rows:
+                return 0
+
+            # Gộp theo người; các dòng đã theo thứ tự id nên email cuối cùng là mới nhất.
+            pending = {}
+            for row_id, full_name, citizen_id, email in rows:
+                key = normalize_key(full_name, citizen_id)
+                entry = pending.setdefault(key, {"full_name": full_name, "citizen_id": citizen_id})
+                entry["email"] = email
+
+            items = list(pending.values())
+            ids = [row_id for row_id, _, _, _ in rows]
+            try:
+                found = self._flush_fn([(e["full_name"], e["citizen_id"], e["email"]) for e in items])
+            except (QuotaExceededError, CircuitOpenError):
+                # Chưa gửi gì lên Sheets, không tính vào số lần thử.
+                raise
+            except Exception:
+                with conn:
+                    conn.executemany("UPDATE pdf_requests SET attempts = attempts + 1 WHERE id = ?",
+                                     [(row_id,) for row_id in ids])
+                    dropped = conn.execute("DELETE FROM pdf_requests WHERE attempts >= ?",
+                                           (self.max_attempts,)).rowcount
+                if dropped:
+                    print(f"❌ Bỏ {dropped} yêu cầu PDF sau {self.max_attempts} lần ghi thất bại.", file=sys.stderr)
+                raise
+
+            for entry, ok in zip(items, found):
+                if not ok:
+                    print(f"⚠️ Không tìm thấy bản ghi để cập nhật PDF: {entry['full_name']} / {entry['citizen_id']}",
+                          file=sys.stderr)
+            with conn:
+                conn.executemany("DELETE FROM pdf_requests WHERE id = ?", [(row_id,) for row_id in ids])
+            print(f"✅ Đã ghi {sum(found)} yêu cầu PDF lên Google Sheet ({len(rows)} yêu cầu trong hàng đợi).")
+            return len(rows)
+        finally:
+            conn.close()
+
+    def _run(self):
+        failures = 0
+        while True:
+            if failures:
+                delay = min(PDF_QUEUE_MAX_BACKOFF_SECONDS, self.flush_seconds * (2 ** failures))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+            else:
+                self._wakeup.wait(timeout=self.flush_seconds * 10)
+                # Chờ thêm một nhịp để gom nhiều yêu cầu vào cùng một lần ghi.
+                time.sleep(self.flush_seconds)
+            self._wakeup.clear()
+            try:
+                while self.flush_once() >= self.batch_size:
+                    pass
+                failures = 0
+            except (QuotaExceededError, CircuitOpenError) as e:
+                # Không tính là lỗi: chỉ chờ tới khi hạn mức ghi cho phép / breaker cho thử lại.
+                print(f"⏳ {e}", file=sys.stderr)
+                time.sleep(e.retry_after)
+            except HttpError as e:
+                failures += 1
+                retry_after = e.resp.get('retry-after') if e.resp is not None else None
+                print(f"❌ Lỗi Google Sheets khi ghi yêu cầu PDF (mã {e.resp.status}), thử lại sau.", file=sys.stderr)
+                if retry_after and str(retry_after).isdigit():
+                    time.sleep(int(retry_after))
+            except Exception as e:
+                failures += 1
+                print(f"❌ Lỗi khi ghi yêu cầu PDF: {e}", file=sys.stderr)
@@ -0,0 +1,139 @@
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# File SQLite riêng chứa trạng thái các bucket dùng chung, tách khỏi file snapshot để các
+# transaction ghi ngắn của bucket không tranh khóa với việc lưu bản chụp dữ liệu.
+QUOTA_DB = os.getenv("QUOTA_DB", "quota.db")
+
+
+class QuotaExceededError(Exception):
+    """Vượt ngân sách gọi upstream; `retry_after` là số giây nên chờ trước khi thử lại."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Vượt hạn mức gọi {name}, thử lại sau {math.ceil(retry_after)} giây.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket theo dõi hạn mức dạng "N request mỗi phút" của một upstream.
+
+    Bucket đầy chứa `per_minute` token và được nạp lại đều đặn. Lời gọi không có sẵn
+    token sẽ giữ chỗ (token âm) rồi chờ tới lượt, theo thứ tự đến trước; nếu phải chờ
+    lâu hơn `max_wait` thì bị từ chối ngay bằng QuotaExceededError thay vì chờ rồi vẫn lỗi.
+
+    Hạn mức của Google tính cho cả service account, nên khi có `path` trạng thái bucket
+    nằm trong một bảng SQLite dùng chung cho mọi worker trên máy (cập nhật trong một
+    transaction BEGIN IMMEDIATE): N worker cùng chia một ngân sách thay vì mỗi worker
+    một ngân sách. Không có `path` (hoặc file lỗi) thì bucket nằm trong bộ nhớ tiến trình.
+    `available` chỉ đọc (WAL), nên thu thập metrics không phải chờ khóa ghi.
+    """
+
+    def __init__(self, name: str, per_minute: float, max_wait: float, path: Optional[str] = None):
+        self.name = name
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.max_wait = max_wait
+        self.path = path
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self.rejected = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS quota_buckets ("
+                " name TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+            self._initialized = True
+        return conn
+
+    def _refill(self, tokens: float, updated: float, now: float) -> float:
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+    def _take(self, tokens: float, max_wait: float) -> Tuple[float, float]:
+        """(số token còn lại, số giây phải chờ) sau khi lấy một token; ném lỗi nếu phải chờ quá lâu."""
+        wait = (1 - tokens) / self.rate if tokens < 1 else 0.0
+        if wait > max_wait:
+            self.rejected += 1
+            raise QuotaExceededError(self.name, wait)
+        return tokens - 1, wait
+
+    def _shared(self, fn: Callable[[float, float], Tuple[float, T]]) -> T:
+        """Chạy `fn(token hiện tại, now) -> (token mới, kết quả)` trên bucket dùng chung."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute("SELECT tokens, updated FROM quota_buckets WHERE name = ?",
+                                   (self.name,)).fetchone()
+                tokens = self.capacity if row is None else self._refill(row[0], row[1], now)
+                new_tokens, result = fn(tokens, now)
+                conn.execute(
+                    "INSERT INTO quota_buckets (name, tokens, updated) VALUES (?, ?, ?)"
+                    " ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (self.name, new_tokens, now))
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _run(self, fn: Callable[[float, float], Tuple[float, T]]) -> T:
+        if self.path is not None:
+            try:
+                return self._shared(fn)
+            except sqlite3.Error as e:
+                print(f"❌ Không dùng được hạn mức chung '{self.name}' ({e}), chuyển sang bucket riêng của tiến trình.",
+                      file=sys.stderr)
+                self.path = None
+        with self._lock:
+            now = time.time()
+            tokens = self._refill(self._tokens, self._updated, now)
+            self._tokens, result = fn(tokens, now)
+            self._updated = now
+            return result
+
+    @property
+    def available(self) -> float:
+        """Số token hiện có (tính phần nạp lại tới lúc này); không ghi gì vào bucket."""
+        now = time.time()
+        if self.path is not None:
+            try:
+                conn = self._connect()
+                try:
+                    row = conn.execute("SELECT tokens, updated FROM quota_buckets WHERE name = ?",
+                                       (self.name,)).fetchone()
+                finally:
+                    conn.close()
+                return self.capacity if row is None else self._refill(row[0], row[1], now)
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            return self._refill(self._tokens, self._updated, now)
+
+    def acquire(self, max_wait: float = None):
+        """Lấy một token, chờ tối đa `max_wait` giây (mặc định của bucket)."""
+        if self.rate <= 0:
+            return
+        max_wait = self.max_wait if max_wait is None else max_wait
+        wait = self._run(lambda tokens, now: self._take(tokens, max_wait))
+        if wait > 0:
+            time.sleep(wait)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from src.sheets_utils import update_pdf_requested
+from src.upstream import run_sheets
+from src.sheets_utils import update_pdf_requested, pdf_request_queue, SheetLookupError
 
 router = APIRouter()
 
@@ -10,8 +11,15 @@ class PDFRequest(BaseModel):
     email: str
 
 @router.post("/request-pdf")
-def request_pdf(data: PDFRequest):
-    updated = update_pdf_requested(data.fullName, data.citizenId, data.email)
+async def request_pdf(data: PDFRequest):
+    try:
+        updated = await run_sheets(update_pdf_requested, data.fullName, data.citizenId, data.email)
+    except SheetLookupError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     if not updated:
         raise HTTPException(status_code=404, detail="Không tìm thấy bản ghi để cập nhật.")
     return {"message": "Yêu cầu gửi chứng chỉ qua email đã được ghi nhận."}
+
+@router.get("/request-pdf/queue")
+async def request_pdf_queue_status():
+    return {"pending": await run_sheets(pdf_request_queue.pending_count)}
@@ -0,0 +1,101 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class _Job:
+    __slots__ = ("name", "fn", "interval", "jitter", "next_run", "last_run", "last_duration",
+                 "last_error", "runs", "running")
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float, jitter: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run = time.time()
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.running = False
+
+
+class RefreshScheduler:
+    """
+    Bộ lập lịch làm mới dữ liệu nền, để request không phải chờ tải dữ liệu.
+
+    - Mọi job chạy ngay khi `start()` (làm nóng cache lúc khởi động).
+    - Sau đó mỗi job chạy lại theo chu kỳ riêng, cộng/trừ một khoảng jitter ngẫu nhiên
+      để các worker không cùng lúc gọi upstream.
+    - Mỗi job chỉ có tối đa một lần chạy tại một thời điểm.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0):
+        self.tick_seconds = tick_seconds
+        self._jobs: Dict[str, _Job] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop = threading.Event()
+
+    def add_job(self, name: str, fn: Callable[[], Any], interval: float, jitter: float = 0.1):
+        self._jobs[name] = _Job(name, fn, interval, jitter)
+
+    def start(self):
+        if self._thread is not None or not self._jobs:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=len(self._jobs), thread_name_prefix="refresh-job")
+        self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.time()
+            for job in list(self._jobs.values()):
+                with self._lock:
+                    if job.running or job.next_run > now:
+                        continue
+                    job.running = True
+                self._executor.submit(self._run_job, job)
+            self._stop.wait(self.tick_seconds)
+
+    def _run_job(self, job: _Job):
+        started = time.time()
+        try:
+            job.fn()
+            job.last_error = None
+        except Exception as e:
+            job.last_error = str(e)
+            print(f"❌ Job làm mới '{job.name}' thất bại: {e}", file=sys.stderr)
+        finally:
+            finished = time.time()
+            with self._lock:
+                job.last_run = started
+                job.last_duration = finished - started
+                job.runs += 1
+                job.next_run = finished + job.interval * (1 + random.uniform(-job.jitter, job.jitter))
+                job.running = False
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "name": job.name,
+                    "interval": job.interval,
+                    "running": job.running,
+                    "runs": job.runs,
+                    "last_run": job.last_run,
+                    "last_duration": job.last_duration,
+                    "last_error": job.last_error,
+                    "next_run": job.next_run,
+                }
+                for job in self._jobs.values()
+            ]
@@ -0,0 +1,175 @@
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Chu kỳ làm mới chỉ mục (giây), có thể chỉnh qua biến môi trường.
+SHEET_INDEX_REFRESH_SECONDS = int(os.getenv("SHEET_INDEX_REFRESH_SECONDS", "300"))
+
+
+def normalize_key(full_name: str, citizen_id: str) -> Tuple[str, str]:
+    """Chuẩn hoá (User_Name, CCCD) giống hệt cách so khớp cũ: strip().lower() cho tên, strip() cho CCCD."""
+    return (full_name.strip().lower(), citizen_id.strip())
+
+
+class IndexSnapshot(NamedTuple):
+    headers: List[str]
+    rows: Dict[Tuple[str, str], List[Dict[str, Any]]]
+    built_at: float
+    # True khi chỉ mục được dựng từ bản chụp trên đĩa hoặc lần làm mới gần nhất thất bại.
+    stale: bool = False
+
+
+class SheetIndex:
+    """
+    Chỉ mục trong bộ nhớ của một spreadsheet, khoá theo (User_Name, CCCD) đã chuẩn hoá.
+
+    Chỉ mục được dựng một lần, làm mới định kỳ bằng một thread nền và được thay
+    thế nguyên khối (gán lại một tham chiếu), nên luồng xử lý request chỉ tra dict,
+    không gọi Google Sheets. Nếu có `store` (SnapshotStore), các dòng tải về được lưu
+    xuống đĩa để worker khởi động lại dùng ngay, và vẫn phục vụ được khi Sheets lỗi.
+    """
+
+    def __init__(self, spreadsheet_id: str, fetch_values: Callable[[str], List[List[str]]],
+                 refresh_seconds: int = SHEET_INDEX_REFRESH_SECONDS, store=None):
+        self.spreadsheet_id = spreadsheet_id
+        self.refresh_seconds = refresh_seconds
+        self.store = store
+        self._fetch_values = fetch_values
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._build_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        # Tắt khi việc làm mới nền do bộ lập lịch chung đảm nhận.
+        self.auto_refresh = True
+
+    @property
+    def snapshot(self) -> Optional[IndexSnapshot]:
+        return self._snapshot
+
+    @property
+    def _store_key(self) -> str:
+        return f"sheet:{self.spreadsheet_id}"
+
+    def refresh(self) -> IndexSnapshot:
+        """Tải lại toàn bộ sheet và thay chỉ mục hiện tại bằng chỉ mục mới."""
+        values = self._fetch_values(self.spreadsheet_id)
+        snapshot = self._build(values, time.time())
+        self._snapshot = snapshot
+        if self.store:
+            self.store.save(self._store_key, values, snapshot.built_at)
+        return snapshot
+
+    def refresh_shared(self) -> Optional[IndexSnapshot]:
+        """
+        Làm mới nền khi nhiều worker dùng chung `store`: nếu worker khác vừa tải xong thì
+        dựng chỉ mục từ bản đó; nếu worker khác đang tải thì giữ bản hiện có, trừ khi bản đó
+        đã stale (ví dụ nạp từ đĩa lúc khởi động) — khi đó chờ worker kia tải xong.
+        """
+        if not self.store:
+            return self.refresh()
+        current = self._snapshot
+        blocking = current is None or current.stale
+        with self.store.process_lock(self._store_key, blocking=blocking) as acquired:
+            saved = self.store.load_if_newer(self._store_key, current.built_at if current else None)
+            if saved is not None and time.time() - saved[1] < self.refresh_seconds:
+                snapshot = self._build(saved[0], saved[1])
+                self._snapshot = snapshot
+                return snapshot
+            if not acquired and not blocking:
+                return current
+            return self.refresh()
+
+    def scheduled_refresh(self) -> Optional[IndexSnapshot]:
+        """Một lần làm mới nền; nếu thất bại thì giữ chỉ mục cũ, đánh dấu stale và ném lại lỗi."""
+        try:
+            snapshot = self.refresh_shared()
+        except Exception:
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot._replace(stale=True)
+            raise
+        if snapshot is not None:
+            print(f"🔄 Đã làm mới chỉ mục sheet {self.spreadsheet_id}: {len(snapshot.rows)} dòng.")
+        return snapshot
+
+    def load_snapshot(self) -> bool:
+        """Dựng chỉ mục từ bản chụp trên đĩa (nếu có và chỉ mục chưa dựng); làm mới thật sẽ chạy nền ngay sau đó."""
+        if self._snapshot is not None or not self.store:
+            return False
+        saved = self.store.load(self._store_key)
+        if saved is None:
+            return False
+        values, fetched_at = saved
+        try:
+            self._snapshot = self._build(values, fetched_at, stale=True)
+        except ValueError:
+            return False
+        self.start_background_refresh(initial_delay=0)
+        return True
+
+    def _build(self, values: List[List[str]], built_at: float, stale: bool = False) -> IndexSnapshot:
+        headers = values[0] if values else []
+        rows: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+
+        if len(values) >= 2:
+            name_index = headers.index('User_Name')
+            cccd_index = headers.index('CCCD')
+            for row in values[1:]:
+                if len(row) > max(name_index, cccd_index):
+                    key = normalize_key(row[name_index], row[cccd_index])
+                    record = {headers[i]: (row[i] if i < len(row) else '') for i in range(len(headers))}
+                    # Giữ mọi dòng khớp theo thứ tự trong sheet.
+                    rows.setdefault(key, []).append(record)
+
+        return IndexSnapshot(headers=headers, rows=rows, built_at=built_at, stale=stale)
+
+    def ensure_ready(self) -> IndexSnapshot:
+        """Dựng chỉ mục lần đầu (chỉ một thread làm việc này) rồi bật làm mới nền."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._build_lock:
+            if self._snapshot is None and not self.load_snapshot():
+                self.refresh()
+                self.start_background_refresh()
+            return self._snapshot
+
+    def refresh_if_older_than(self, max_age: float) -> IndexSnapshot:
+        """Làm mới ngay nếu chỉ mục đã cũ hơn `max_age` giây; các thread đồng thời dùng chung một lần tải."""
+        with self._build_lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.time() - snapshot.built_at > max_age:
+                snapshot = self.refresh()
+                self.start_background_refresh()
+            return snapshot
+
+    def lookup(self, full_name: str, citizen_id: str) -> Optional[Dict[str, Any]]:
+        """Dòng đầu tiên khớp (giống vòng lặp tìm kiếm cũ), hoặc None."""
+        matches = self.lookup_all(full_name, citizen_id)
+        return matches[0] if matches else None
+
+    def lookup_all(self, full_name: str, citizen_id: str) -> List[Dict[str, Any]]:
+        snapshot = self.ensure_ready()
+        return snapshot.rows.get(normalize_key(full_name, citizen_id), [])
+
+    def lookup_many(self, pairs: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+        """Tra nhiều người trên cùng một bản chỉ mục; kết quả giữ đúng thứ tự đầu vào."""
+        rows = self.ensure_ready().rows
+        return [rows.get(normalize_key(full_name, citizen_id), []) for full_name, citizen_id in pairs]
+
+    def start_background_refresh(self, initial_delay: float = None):
+        if self._refresher is not None or not self.auto_refresh or self.refresh_seconds <= 0:
+            return
+        delay = self.refresh_seconds if initial_delay is None else initial_delay
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, args=(delay,), name=f"sheet-index-{self.spreadsheet_id[:8]}", daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self, delay: float):
+        while True:
+            time.sleep(delay)
+            delay = self.refresh_seconds
+            try:
+                self.scheduled_refresh()
+            except Exception as e:
+                print(f"❌ Lỗi khi làm mới chỉ mục sheet {self.spreadsheet_id}: {e}", file=sys.stderr)
@@ -0,0 +1,144 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from src.cache import SingleFlight
+from src.circuit_breaker import CircuitBreaker, RetryPolicy
+from src.metrics import track_upstream
+from src.quota import QUOTA_DB, TokenBucket
+from src.sheets_discovery import fetch_full_document, load_discovery_document
+
+SERVICE_ACCOUNT_FILE = os.getenv('GOOGLE_SERVICE_ACCOUNT_FILE', 'credentials.json')
+READONLY_SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+READWRITE_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+# Ghi đè endpoint Sheets API (ví dụ máy chủ giả lập của benchmarks/); None là endpoint thật.
+SHEETS_API_ENDPOINT = os.getenv('SHEETS_API_ENDPOINT')
+# Hạn mức Sheets API dùng chung cho mọi worker trên máy (mặc định của Google: 60 đọc và 60 ghi mỗi phút cho
+# một service account), và thời gian tối đa một lời gọi được xếp hàng chờ token.
+SHEETS_READ_REQUESTS_PER_MINUTE = float(os.getenv('SHEETS_READ_REQUESTS_PER_MINUTE', '60'))
+SHEETS_WRITE_REQUESTS_PER_MINUTE = float(os.getenv('SHEETS_WRITE_REQUESTS_PER_MINUTE', '60'))
+SHEETS_QUOTA_MAX_WAIT_SECONDS = float(os.getenv('SHEETS_QUOTA_MAX_WAIT_SECONDS', '5'))
+# Timeout socket (giây) của client Sheets. httplib2 chỉ có một timeout, áp dụng cho cả lúc
+# kết nối lẫn mỗi lần đọc; mặc định của googleapiclient là 60 giây.
+SHEETS_SOCKET_TIMEOUT_SECONDS = float(os.getenv('SHEETS_SOCKET_TIMEOUT_SECONDS', '10'))
+SHEETS_RETRY_ATTEMPTS = int(os.getenv('SHEETS_RETRY_ATTEMPTS', '3'))
+
+
+class SheetsClientManager:
+    """
+    Quản lý client Google Sheets dùng chung cho toàn tiến trình.
+
+    - Tài liệu discovery được nạp và parse đúng một lần, từ bản đóng gói sẵn trong repo
+      (src/sheets_discovery_v4.json) nên không cần mạng.
+    - googleapiclient và google.oauth2 chỉ được import ở lần dùng đầu tiên, để worker
+      khởi động nhanh.
+    - Credentials được tạo một lần cho mỗi bộ scope, nên access token được tái sử dụng.
+    - httplib2 không an toàn khi dùng chung giữa các thread, nên mỗi thread giữ
+      service riêng (và kết nối HTTP keep-alive riêng) cho từng bộ scope.
+    """
+
+    def __init__(self, service_account_file: str = SERVICE_ACCOUNT_FILE):
+        self.service_account_file = service_account_file
+        self._lock = threading.Lock()
+        self._discovery_doc: Optional[dict] = None
+        self._credentials: Dict[Tuple[str, ...], Any] = {}
+        self._local = threading.local()
+
+    def is_available(self) -> bool:
+        return os.path.exists(self.service_account_file)
+
+    def _discovery_document(self) -> dict:
+        if self._discovery_doc is not None:
+            return self._discovery_doc
+        with self._lock:
+            if self._discovery_doc is None:
+                self._discovery_doc = load_discovery_document() or fetch_full_document()
+        return self._discovery_doc
+
+    def _credentials_for(self, scopes: Tuple[str, ...]):
+        creds = self._credentials.get(scopes)
+        if creds is not None:
+            return creds
+        with self._lock:
+            if scopes not in self._credentials:
+                if not self.is_available():
+                    raise FileNotFoundError(f"File '{self.service_account_file}' không tồn tại.")
+                from google.oauth2 import service_account
+                self._credentials[scopes] = service_account.Credentials.from_service_account_file(
+                    self.service_account_file, scopes=list(scopes))
+            return self._credentials[scopes]
+
+    def spreadsheets(self, scopes: Sequence[str] = READONLY_SCOPES):
+        """Trả về resource `spreadsheets()` của thread hiện tại cho bộ scope đã cho."""
+        key = tuple(scopes)
+        services = getattr(self._local, 'services', None)
+        if services is None:
+            services = self._local.services = {}
+        service = services.get(key)
+        if service is None:
+            import google_auth_httplib2
+            import httplib2
+            from googleapiclient.discovery import build_from_document
+            client_options = {'api_endpoint': SHEETS_API_ENDPOINT} if SHEETS_API_ENDPOINT else None
+            http = google_auth_httplib2.AuthorizedHttp(
+                self._credentials_for(key), http=httplib2.Http(timeout=SHEETS_SOCKET_TIMEOUT_SECONDS))
+            service = build_from_document(self._discovery_document(), http=http, client_options=client_options)
+            services[key] = service
+        return service.spreadsheets()
+
+    def warm_up(self, scopes_list: Sequence[Sequence[str]] = (READONLY_SCOPES, READWRITE_SCOPES)):
+        """Nạp trước discovery và credentials để request đầu tiên không phải trả chi phí này."""
+        self._discovery_document()
+        for scopes in scopes_list:
+            self._credentials_for(tuple(scopes))
+
+
+sheets_clients = SheetsClientManager()
+
+
+# Hai bucket nằm trong file hạn mức dùng chung, nên mọi worker trên máy cùng chia một hạn mức.
+sheets_read_quota = TokenBucket("Google Sheets (đọc)", SHEETS_READ_REQUESTS_PER_MINUTE, SHEETS_QUOTA_MAX_WAIT_SECONDS,
+                                path=QUOTA_DB)
+sheets_write_quota = TokenBucket("Google Sheets (ghi)", SHEETS_WRITE_REQUESTS_PER_MINUTE, SHEETS_QUOTA_MAX_WAIT_SECONDS,
+                                 path=QUOTA_DB)
+_read_flight = SingleFlight()
+sheets_breaker = CircuitBreaker("Google Sheets")
+_retry_policy = RetryPolicy(SHEETS_RETRY_ATTEMPTS)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Lỗi tạm thời của Sheets API (timeout, mất kết nối, 429, 5xx): được thử lại và tính vào breaker."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    from googleapiclient.errors import HttpError
+    if isinstance(exc, HttpError):
+        return exc.resp is not None and (exc.resp.status >= 500 or exc.resp.status == 429)
+    import httplib2
+    from google.auth.exceptions import TransportError
+    return isinstance(exc, (httplib2.HttpLib2Error, TransportError))
+
+
+def _send(request, spreadsheet_id: str, quota: TokenBucket):
+    def attempt():
+        with track_upstream("sheets", spreadsheet_id):
+            return request.execute()
+    def acquire(budget: Optional[float]):
+        # Mỗi lần thử là một lời gọi thật nên tiêu một token hạn mức; không chờ token quá deadline.
+        quota.acquire(None if budget is None else min(quota.max_wait, budget))
+    return sheets_breaker.call(attempt, is_transient_error, _retry_policy, before_attempt=acquire,
+                               attempt_timeout=SHEETS_SOCKET_TIMEOUT_SECONDS)
+
+
+def execute(request, spreadsheet_id: str):
+    """
+    Gửi một request Google Sheets (kết quả của `.get(...)`, `.batchUpdate(...)`...).
+
+    Mọi lời gọi Sheets đều đi qua đây: mỗi lời gọi tiêu một token của hạn mức đọc/ghi
+    (ném QuotaExceededError nếu phải chờ quá lâu), các lần đọc giống hệt nhau đang chạy
+    đồng thời được gộp thành một lời gọi, và thời gian được đo theo spreadsheet. Lỗi tạm
+    thời được thử lại; khi Sheets lỗi liên tiếp, breaker mở và lời gọi bị từ chối ngay
+    bằng CircuitOpenError.
+    """
+    if request.method != 'GET':
+        return _send(request, spreadsheet_id, sheets_write_quota)
+    return _read_flight.do(request.uri, lambda: _send(request, spreadsheet_id, sheets_read_quota))
@@ -0,0 +1,110 @@
+"""
+Tài liệu discovery của Google Sheets API v4, đóng gói sẵn trong repo.
+
+`build_from_document` cần tài liệu discovery để dựng client. Bản đầy đủ (~300 KB) phải tải
+qua mạng hoặc parse từ cache tĩnh của googleapiclient, nên mỗi worker mất thêm thời gian lúc
+khởi động. File `sheets_discovery_v4.json` chỉ giữ các method mà API này gọi (DISCOVERY_METHODS)
+cùng các schema mà tham số và request body của chúng tham chiếu, đã bỏ phần mô tả; nạp nó không cần mạng.
+
+Khi gọi thêm method Sheets mới, thêm nó vào DISCOVERY_METHODS rồi tạo lại file:
+
+    python -m src.sheets_discovery
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DISCOVERY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sheets_discovery_v4.json")
+DISCOVERY_URL = "https://sheets.googleapis.com/$discovery/rest?version=v4"
+
+# (đường dẫn resource, tên method) của mọi lời gọi Sheets trong repo.
+DISCOVERY_METHODS: Tuple[Tuple[Tuple[str, ...], str], ...] = (
+    (("spreadsheets",), "get"),
+    (("spreadsheets", "values"), "get"),
+    (("spreadsheets", "values"), "batchUpdate"),
+)
+
+_DROPPED_KEYS = ("description", "documentationLink", "icons", "enumDescriptions")
+
+
+def load_discovery_document(path: str = DISCOVERY_FILE) -> Optional[dict]:
+    """Tài liệu discovery đóng gói sẵn; None nếu file không có."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _refs(node: Any) -> Iterable[str]:
+    if isinstance(node, dict):
+        if "$ref" in node:
+            yield node["$ref"]
+        for value in node.values():
+            yield from _refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _refs(value)
+
+
+def _strip(node: Any) -> Any:
+    # Chỉ bỏ các khoá mô tả có giá trị là chuỗi/danh sách: schema có thể có thuộc tính tên "description".
+    if isinstance(node, dict):
+        return {key: _strip(value) for key, value in node.items()
+                if not (key in _DROPPED_KEYS and isinstance(value, (str, list)))}
+    if isinstance(node, list):
+        return [_strip(value) for value in node]
+    return node
+
+
+def trim_discovery_document(doc: Dict[str, Any], methods=DISCOVERY_METHODS) -> Dict[str, Any]:
+    """Bản rút gọn của `doc` chỉ với `methods` và các schema mà tham số/request body của chúng cần."""
+    resources: Dict[str, Any] = {}
+    wanted, responses = set(), set()
+    for path, name in methods:
+        source, target = doc, {"resources": resources}
+        for part in path:
+            source = source["resources"][part]
+            target = target.setdefault("resources", {}).setdefault(part, {})
+        method = source["methods"][name]
+        target.setdefault("methods", {})[name] = method
+        wanted.update(_refs({key: value for key, value in method.items() if key != "response"}))
+        responses.update(_refs(method.get("response", {})))
+
+    schemas: Dict[str, Any] = {}
+    while wanted:
+        name = wanted.pop()
+        if name not in schemas:
+            schemas[name] = doc["schemas"][name]
+            wanted.update(_refs(schemas[name]))
+    # Schema của response chỉ dùng cho docstring của method (client luôn trả dict): thay
+    # bằng một object rỗng, nếu không `Spreadsheet` sẽ kéo theo gần như toàn bộ tài liệu.
+    for name in responses - schemas.keys():
+        schemas[name] = {"id": name, "type": "object"}
+
+    trimmed = {key: value for key, value in doc.items() if key not in ("resources", "schemas")}
+    trimmed["resources"] = resources
+    trimmed["schemas"] = schemas
+    return _strip(trimmed)
+
+
+def fetch_full_document() -> Dict[str, Any]:
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+        doc = get_static_doc("sheets", "v4")
+        if doc is not None:
+            return json.loads(doc)
+    except ImportError:
+        pass
+    import requests
+    response = requests.get(DISCOVERY_URL, timeout=20)
+    response.raise_for_status()
+    return response.json()
+
+
+if __name__ == "__main__":
+    full = fetch_full_document()
+    with open(DISCOVERY_FILE, "w", encoding="utf-8") as f:
+        json.dump(trim_discovery_document(full), f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+        f.write("\n")
+    print(f"Đã ghi {DISCOVERY_FILE} (revision {full.get('revision')}).")
@@ -1,108 +1,168 @@
-import os
-from typing import List, Dict, Any
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from typing import Callable, List, Dict, Any, Tuple, TypeVar
 from googleapiclient.errors import HttpError
 
-SERVICE_ACCOUNT_FILE = 'credentials.json'
+from src.name_search import SheetNameSearch
+from src.pdf_queue import PdfRequestQueue
+from src.circuit_breaker import CircuitOpenError
+from src.quota import QuotaExceededError
+from src.sheet_index import SheetIndex, normalize_key
+from src.snapshot_store import snapshot_store
+from src.sheets_client import execute, sheets_clients, READONLY_SCOPES, READWRITE_SCOPES
+
 ACTIVITY_SHEET_ID = '1BGbTI34I8H_cZaRey5UHuPkxZa1bMsk1JanXCZFdj3s'
 CERTIFICATE_SHEET_ID = '1uAVk9XZExLgCdfukYGxk8NSFh5CZtrfjS0gQtxjTQaQ'
 SHEET_NAME = 'Sheet1'
+PDF_REQUESTED_HEADER = 'PDF_Requested'
+PDF_REQUESTED_FALLBACK_COLUMN = 'G'
+PDF_LOOKUP_MAX_INDEX_AGE_SECONDS = 60
+
+T = TypeVar('T')
+
 
+class SheetLookupError(Exception):
+    """Không đọc được Google Sheet khi tra cứu."""
 
-# === Utility to get sheet API ===
+
+# === Utility to get sheet API (shared, long-lived client) ===
 def get_sheet_api(scopes: List[str]):
-    if not os.path.exists(SERVICE_ACCOUNT_FILE):
-        raise FileNotFoundError(f"File '{SERVICE_ACCOUNT_FILE}' không tồn tại.")
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=scopes)
-    service = build('sheets', 'v4', credentials=creds)
-    return service.spreadsheets()
+    return sheets_clients.spreadsheets(scopes)
 
 
-# === Generic search function ===
-def _search_one_sheet(sheet_api, spreadsheet_id: str, full_name: str, citizen_id: str):
-    try:
-        result = sheet_api.values().get(spreadsheetId=spreadsheet_id, range=SHEET_NAME).execute()
-        values = result.get('values', [])
+# === Fetch raw values of a sheet ===
+def _fetch_sheet_values(spreadsheet_id: str) -> List[List[str]]:
+    sheet_api = get_sheet_api(READONLY_SCOPES)
+    result = execute(sheet_api.values().get(spreadsheetId=spreadsheet_id, range=SHEET_NAME), spreadsheet_id)
+    return result.get('values', [])
 
-        if not values or len(values) < 2:
-            return None
 
-        headers = values[0]
-        name_index = headers.index('User_Name')
-        cccd_index = headers.index('CCCD')
+# === In-memory indexes (built once, refreshed in background) ===
+activity_index = SheetIndex(ACTIVITY_SHEET_ID, _fetch_sheet_values, store=snapshot_store)
+certificate_index = SheetIndex(CERTIFICATE_SHEET_ID, _fetch_sheet_values, store=snapshot_store)
+
+# === Diacritic-insensitive name search (admin), rebuilt when an index changes ===
+activity_search = SheetNameSearch(activity_index)
+certificate_search = SheetNameSearch(certificate_index)
 
-        for row in values[1:]:
-            if len(row) > max(name_index, cccd_index):
-                if (
-                    row[name_index].strip().lower() == full_name.strip().lower()
-                    and row[cccd_index].strip() == citizen_id.strip()
-                ):
-                    return {headers[i]: (row[i] if i < len(row) else '') for i in range(len(headers))}
 
-        return None
+# === Generic search function ===
+def _call_sheet(fn: Callable[..., T], *args) -> T:
+    """Gọi `fn` trên chỉ mục sheet; lỗi Google Sheets hoặc dữ liệu sheet được đổi thành SheetLookupError."""
+    try:
+        return fn(*args)
+    except (QuotaExceededError, CircuitOpenError):
+        raise
     except HttpError as e:
-        return {"error": f"Không thể truy cập Google Sheet. Mã lỗi: {e.resp.status}"}
+        raise SheetLookupError(f"Không thể truy cập Google Sheet. Mã lỗi: {e.resp.status}") from e
     except Exception as e:
-        return {"error": "Lỗi máy chủ nội bộ khi xử lý sheet."}
+        raise SheetLookupError("Lỗi máy chủ nội bộ khi xử lý sheet.") from e
+
+
+def _search_one_sheet(index: SheetIndex, full_name: str, citizen_id: str):
+    return _call_sheet(index.lookup, full_name, citizen_id)
 
 
 # === Find info from ACTIVITY sheet ===
 def find_activity_info(full_name: str, citizen_id: str):
-    sheet_api = get_sheet_api(['https://www.googleapis.com/auth/spreadsheets.readonly'])
-    return _search_one_sheet(sheet_api, ACTIVITY_SHEET_ID, full_name, citizen_id)
+    return _search_one_sheet(activity_index, full_name, citizen_id)
 
 
 # === Find info from CERTIFICATE sheet ===
 def find_certificate_info(full_name: str, citizen_id: str):
-    sheet_api = get_sheet_api(['https://www.googleapis.com/auth/spreadsheets.readonly'])
-    return _search_one_sheet(sheet_api, CERTIFICATE_SHEET_ID, full_name, citizen_id)
+    return _search_one_sheet(certificate_index, full_name, citizen_id)
 
 
-# === Update PDF Requested column ===
-def update_pdf_requested(full_name: str, citizen_id: str, email: str):
-    sheet_api = get_sheet_api(['https://www.googleapis.com/auth/spreadsheets'])
+# === Batch search (one index pass for many people) ===
+def _search_many(index: SheetIndex, pairs: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+    return _call_sheet(index.lookup_many, pairs)
+
+
+def find_activity_infos(pairs: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+    return _search_many(activity_index, pairs)
 
-    result = sheet_api.values().get(spreadsheetId=CERTIFICATE_SHEET_ID, range=SHEET_NAME).execute()
+
+def find_certificate_infos(pairs: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+    return _search_many(certificate_index, pairs)
+
+
+# === Update PDF Requested column ===
+def _column_letter(index: int) -> str:
+    """Chỉ số cột (bắt đầu từ 0) -> chữ cái cột A1 (A, B, ..., Z, AA, ...)."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def apply_pdf_requests(items: List[Tuple[str, str, str]]) -> List[bool]:
+    """
+    Ghi Email và PDF_Requested=TRUE cho nhiều người (full_name, citizen_id, email)
+    bằng một lần đọc sheet và một lần values().batchUpdate. Trả về cờ tìm thấy cho từng người.
+    """
+    sheet_api = get_sheet_api(READWRITE_SCOPES)
+
+    result = execute(sheet_api.values().get(spreadsheetId=CERTIFICATE_SHEET_ID, range=SHEET_NAME), CERTIFICATE_SHEET_ID)
     values = result.get('values', [])
 
     if not values or len(values) < 2:
-        return False
+        return [False] * len(items)
 
     headers = values[0]
     try:
         name_index = headers.index('User_Name')
         cccd_index = headers.index('CCCD')
         email_index = headers.index('Email')
-
-        requested_col_letter = "G"
     except ValueError:
         raise Exception("Thiếu cột cần thiết trong sheet.")
+    if PDF_REQUESTED_HEADER in headers:
+        requested_col_letter = _column_letter(headers.index(PDF_REQUESTED_HEADER))
+    else:
+        requested_col_letter = PDF_REQUESTED_FALLBACK_COLUMN
+    email_col_letter = _column_letter(email_index)
 
+    first_row = {}
     for i, row in enumerate(values[1:], start=2):
         if len(row) > max(name_index, cccd_index):
-            if (
-                row[name_index].strip().lower() == full_name.strip().lower()
-                and row[cccd_index].strip() == citizen_id.strip()
-            ):
-                # Ghi email nếu khác
-                email_cell = f"{SHEET_NAME}!{chr(65 + email_index)}{i}"
-                sheet_api.values().update(
-                    spreadsheetId=CERTIFICATE_SHEET_ID,
-                    range=email_cell,
-                    valueInputOption="USER_ENTERED",
-                    body={"values": [[email]]}
-                ).execute()
-
-                # Ghi TRUE vào G{i} (PDF_Requested)
-                sheet_api.values().update(
-                    spreadsheetId=CERTIFICATE_SHEET_ID,
-                    range=f"{SHEET_NAME}!{requested_col_letter}{i}",
-                    valueInputOption="USER_ENTERED",
-                    body={"values": [["TRUE"]]}
-                ).execute()
-
-                return True
-
-    return False
+            first_row.setdefault(normalize_key(row[name_index], row[cccd_index]), i)
+
+    data = []
+    found = []
+    for full_name, citizen_id, email in items:
+        i = first_row.get(normalize_key(full_name, citizen_id))
+        found.append(i is not None)
+        if i is None:
+            continue
+        data.append({"range": f"{SHEET_NAME}!{email_col_letter}{i}", "values": [[email]]})
+        data.append({"range": f"{SHEET_NAME}!{requested_col_letter}{i}", "values": [["TRUE"]]})
+
+    if data:
+        execute(sheet_api.values().batchUpdate(
+            spreadsheetId=CERTIFICATE_SHEET_ID,
+            body={"valueInputOption": "USER_ENTERED", "data": data}
+        ), CERTIFICATE_SHEET_ID)
+    return found
+
+
+pdf_request_queue = PdfRequestQueue(apply_pdf_requests)
+
+
+def _find_certificate_for_pdf(full_name: str, citizen_id: str):
+    match = certificate_index.lookup(full_name, citizen_id)
+    if match is None:
+        # Người vừa được thêm vào sheet có thể chưa có trong chỉ mục.
+        certificate_index.refresh_if_older_than(PDF_LOOKUP_MAX_INDEX_AGE_SECONDS)
+        match = certificate_index.lookup(full_name, citizen_id)
+    return match
+
+
+def update_pdf_requested(full_name: str, citizen_id: str, email: str):
+    """
+    Kiểm tra bản ghi qua chỉ mục chứng nhận rồi xếp yêu cầu vào hàng đợi ghi nền.
+    Trả về False nếu không có bản ghi; việc ghi lên sheet diễn ra sau đó. Ném
+    SheetLookupError nếu không đọc được sheet chứng nhận.
+    """
+    if _call_sheet(_find_certificate_for_pdf, full_name, citizen_id) is None:
+        return False
+    pdf_request_queue.enqueue(full_name, citizen_id, email)
+    return True
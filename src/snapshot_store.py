@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có khoá giữa các tiến trình, mỗi worker tự làm mới.
+    fcntl = None
+
+# File SQLite lưu bản chụp cuối cùng của mỗi nguồn dữ liệu (kết quả scraper, các dòng của sheet).
+SNAPSHOT_DB = os.getenv("SNAPSHOT_DB", "snapshots.db")
+
+
+class SnapshotStore:
+    """
+    Kho bản chụp trên đĩa để worker khởi động lại vẫn có dữ liệu ngay và vẫn phục vụ
+    được (kèm cờ stale) khi upstream gặp sự cố.
+
+    Mỗi khoá giữ đúng một bản mới nhất cùng thời điểm tải. Lỗi đọc/ghi đĩa chỉ được
+    ghi log, không bao giờ làm hỏng request.
+
+    File này dùng chung cho mọi worker gunicorn trên cùng máy: `process_lock` bảo
+    đảm chỉ một worker tải lại một khoá tại một thời điểm, các worker còn lại đọc
+    kết quả bằng `load_if_newer` (chỉ giải mã khi phiên bản thực sự mới hơn).
+
+    Bản đã mã hoá sẵn của một giá trị (JSON, các bản nén, ETag) có thể được lưu kèm
+    trong bảng `encoded_snapshots`, để worker khác phục vụ ngay bằng `load_encoded_if_newer`
+    mà không phải giải mã rồi mã hoá, nén lại.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_DB):
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS snapshots ("
+                        " key TEXT PRIMARY KEY,"
+                        " payload TEXT NOT NULL,"
+                        " fetched_at REAL NOT NULL)"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS encoded_snapshots ("
+                        " key TEXT PRIMARY KEY,"
+                        " etag TEXT NOT NULL,"
+                        " body BLOB NOT NULL,"
+                        " gzip BLOB,"
+                        " br BLOB,"
+                        " fetched_at REAL NOT NULL)"
+                    )
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def save(self, key: str, value: Any, fetched_at: float, encoded: Any = None):
+        """
+        Lưu bản chụp của `key`. `encoded` (tuỳ chọn) là bản đã mã hoá sẵn của `value`, có các
+        thuộc tính `body` (JSON dạng bytes), `etag` và `variants` (bản nén theo content-coding).
+        """
+        try:
+            if encoded is not None:
+                payload = encoded.body.decode("utf-8")
+            else:
+                payload = json.dumps(value, ensure_ascii=False)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT INTO snapshots (key, payload, fetched_at) VALUES (?, ?, ?)"
+                        " ON CONFLICT(key) DO UPDATE SET payload = excluded.payload, fetched_at = excluded.fetched_at",
+                        (key, payload, fetched_at))
+                    if encoded is None:
+                        # Không để lại bản mã hoá của phiên bản cũ hơn.
+                        conn.execute("DELETE FROM encoded_snapshots WHERE key = ?", (key,))
+                    else:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO encoded_snapshots (key, etag, body, gzip, br, fetched_at)"
+                            " VALUES (?, ?, ?, ?, ?, ?)",
+                            (key, encoded.etag, encoded.body, encoded.variants.get("gzip"),
+                             encoded.variants.get("br"), fetched_at))
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"❌ Không ghi được snapshot '{key}': {e}", file=sys.stderr)
+
+    def load(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Trả về (giá trị, thời điểm tải) hoặc None nếu chưa có bản chụp."""
+        return self.load_if_newer(key, None)
+
+    def load_if_newer(self, key: str, since: Optional[float]) -> Optional[Tuple[Any, float]]:
+        """Như `load`, nhưng chỉ đọc và giải mã payload khi bản chụp mới hơn `since`."""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT payload, fetched_at FROM snapshots WHERE key = ? AND fetched_at > ?",
+                    (key, since if since is not None else float("-inf"))).fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"❌ Không đọc được snapshot '{key}': {e}", file=sys.stderr)
+            return None
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def load_encoded_if_newer(self, key: str, since: Optional[float]
+                              ) -> Optional[Tuple[bytes, str, Dict[str, bytes], float]]:
+        """(body, etag, các bản nén, thời điểm tải) của bản mã hoá sẵn mới hơn `since`, hoặc None."""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT body, etag, gzip, br, fetched_at FROM encoded_snapshots WHERE key = ? AND fetched_at > ?",
+                    (key, since if since is not None else float("-inf"))).fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"❌ Không đọc được snapshot '{key}': {e}", file=sys.stderr)
+            return None
+        if row is None:
+            return None
+        body, etag, gzip_body, br_body, fetched_at = row
+        variants = {coding: bytes(data) for coding, data in (("gzip", gzip_body), ("br", br_body)) if data is not None}
+        return bytes(body), etag, variants, fetched_at
+
+    @contextmanager
+    def process_lock(self, key: str, blocking: bool = True, timeout: float = 60) -> Iterator[bool]:
+        """
+        Khoá độc quyền theo key giữa các tiến trình (flock trên một file cạnh file SQLite).
+        Trả về True nếu giữ được khoá; với blocking=False thì không chờ.
+        """
+        if fcntl is None:
+            yield True
+            return
+        lock_path = f"{self.path}.{re.sub(r'[^A-Za-z0-9_.-]', '_', key)}.lock"
+        with open(lock_path, "a") as handle:
+            deadline = time.monotonic() + timeout
+            acquired = False
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    acquired = True
+                    break
+                except BlockingIOError:
+                    if not blocking or time.monotonic() >= deadline:
+                        break
+                    time.sleep(0.1)
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Mục tiêu thời gian khởi động của một worker (import + sự kiện startup), tính bằng giây.
+STARTUP_TARGET_SECONDS = float(os.getenv("STARTUP_TARGET_SECONDS", "2.0"))
+
+
+def _process_age() -> Optional[float]:
+    """Số giây kể từ khi tiến trình được tạo (Linux, đọc /proc); None nếu không đọc được."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Trường thứ 22 (starttime, tính bằng clock tick từ lúc boot); tên tiến trình có thể chứa khoảng trắng.
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    """
+    Ghi thời gian từng giai đoạn khởi động của worker để đối chiếu với STARTUP_TARGET_SECONDS.
+
+    Giai đoạn chạy nền (không chặn worker nhận request) được ghi riêng và không tính vào tổng.
+    """
+
+    def __init__(self, target_seconds: float = STARTUP_TARGET_SECONDS):
+        self.target_seconds = target_seconds
+        self.created = time.perf_counter()
+        # Thời gian từ lúc tạo tiến trình tới khi module này được import (trình thông dịch + import trước đó).
+        self.interpreter_seconds = _process_age()
+        self._phases: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.ready_at: Optional[float] = None
+
+    def record(self, name: str, seconds: float, background: bool = False):
+        with self._lock:
+            self._phases.append({"phase": name, "seconds": round(seconds, 4), "background": background})
+
+    @contextmanager
+    def phase(self, name: str, background: bool = False) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, background)
+
+    def mark(self, name: str, since: float):
+        """Ghi giai đoạn kéo dài từ mốc `since` (time.perf_counter()) tới bây giờ."""
+        self.record(name, time.perf_counter() - since)
+
+    def ready(self):
+        """Gọi khi worker sẵn sàng nhận request; in cảnh báo nếu vượt mục tiêu."""
+        self.ready_at = time.perf_counter()
+        report = self.report()
+        total = report["total_seconds"]
+        if report["within_target"]:
+            print(f"⏱️ Worker sẵn sàng sau {total:.2f}s (mục tiêu {self.target_seconds:.2f}s).")
+        else:
+            slowest = max((p for p in report["phases"] if not p["background"]),
+                          key=lambda p: p["seconds"], default=None)
+            print(f"⚠️ Worker khởi động mất {total:.2f}s, vượt mục tiêu {self.target_seconds:.2f}s"
+                  + (f" (chậm nhất: {slowest['phase']} {slowest['seconds']:.2f}s)." if slowest else "."),
+                  file=sys.stderr)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = list(self._phases)
+        foreground = [p for p in phases if not p["background"]]
+        total = sum(p["seconds"] for p in foreground) + (self.interpreter_seconds or 0.0)
+        return {
+            "ready": self.ready_at is not None,
+            "interpreter_seconds": (round(self.interpreter_seconds, 4)
+                                    if self.interpreter_seconds is not None else None),
+            "total_seconds": round(total, 4),
+            "target_seconds": self.target_seconds,
+            "within_target": total <= self.target_seconds,
+            "phases": phases,
+        }
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Tuple
+
+import anyio
+from anyio import to_thread
+from fastapi import HTTPException
+
+from src.circuit_breaker import deadline_scope
+
+# Mỗi upstream có một pool riêng (giới hạn số lời gọi blocking đồng thời) và timeout riêng,
+# để govolunteerhcmc.vn chậm không chiếm hết luồng của Google Sheets và ngược lại.
+UPSTREAM_POOLS = {
+    "scrape": {
+        "concurrency": int(os.getenv("SCRAPE_CONCURRENCY", "8")),
+        "timeout": float(os.getenv("SCRAPE_TIMEOUT_SECONDS", "45")),
+    },
+    "sheets": {
+        "concurrency": int(os.getenv("SHEETS_CONCURRENCY", "8")),
+        "timeout": float(os.getenv("SHEETS_TIMEOUT_SECONDS", "20")),
+    },
+}
+
+_limiters: Dict[str, anyio.CapacityLimiter] = {}
+_SENTINEL = object()
+
+
+def _limiter(pool: str) -> anyio.CapacityLimiter:
+    # CapacityLimiter phải được tạo bên trong event loop, nên tạo lười ở lần dùng đầu tiên.
+    limiter = _limiters.get(pool)
+    if limiter is None:
+        limiter = _limiters[pool] = anyio.CapacityLimiter(UPSTREAM_POOLS[pool]["concurrency"])
+    return limiter
+
+
+async def run_in_pool(pool: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Chạy một lời gọi blocking trong pool của upstream tương ứng; quá timeout thì trả 504.
+
+    Token của pool được giữ tới khi luồng thật sự chạy xong, kể cả khi request đã bỏ chờ
+    vì timeout: luồng bị bỏ rơi vẫn đang gọi upstream, nên vẫn được tính vào giới hạn
+    đồng thời (và vào pool_stats()).
+
+    Timeout của pool cũng là deadline của lời gọi trong luồng (deadline_scope): breaker
+    không bắt đầu lần thử lại nào không kịp xong trước khi request bỏ chờ.
+    """
+    timeout = UPSTREAM_POOLS[pool]["timeout"]
+    deadline = time.monotonic() + timeout
+    limiter = _limiter(pool)
+    loop = asyncio.get_running_loop()
+    token = object()
+    # Luồng và coroutine "giành" quyền trả token: luồng nếu nó bắt đầu chạy `fn`, coroutine
+    # nếu lời gọi bị huỷ trước khi luồng kịp nhận việc (anyio bỏ qua việc đã huỷ).
+    owner = []
+    owner_lock = threading.Lock()
+
+    def claim(who: str) -> bool:
+        with owner_lock:
+            if owner:
+                return False
+            owner.append(who)
+            return True
+
+    def release_from_thread():
+        try:
+            loop.call_soon_threadsafe(limiter.release_on_behalf_of, token)
+        except RuntimeError:
+            pass  # event loop đã đóng (tắt server)
+
+    def call():
+        if not claim("thread"):
+            return _SENTINEL
+        try:
+            with deadline_scope(deadline):
+                return fn(*args, **kwargs)
+        finally:
+            release_from_thread()
+
+    try:
+        with anyio.fail_after(timeout):
+            await limiter.acquire_on_behalf_of(token)
+            try:
+                return await to_thread.run_sync(call, abandon_on_cancel=True)
+            finally:
+                if claim("caller"):
+                    limiter.release_on_behalf_of(token)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Upstream '{pool}' phản hồi quá chậm.")
+
+
+def pool_stats() -> Dict[str, Tuple[int, int]]:
+    """(số luồng đang bận, số luồng tối đa) của từng pool upstream và pool mặc định của anyio; gọi trong event loop."""
+    stats = {pool: (int(limiter.borrowed_tokens), int(limiter.total_tokens)) for pool, limiter in _limiters.items()}
+    default = to_thread.current_default_thread_limiter()
+    stats["default"] = (int(default.borrowed_tokens), int(default.total_tokens))
+    return stats
+
+
+async def run_scrape(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    return await run_in_pool("scrape", fn, *args, **kwargs)
+
+
+async def run_sheets(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    return await run_in_pool("sheets", fn, *args, **kwargs)
+
+
+async def iterate_in_pool(pool: str, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """Duyệt một iterator blocking (ví dụ stream từng khối dòng của sheet) trong pool của upstream."""
+    while True:
+        item = await run_in_pool(pool, next, iterator, _SENTINEL)
+        if item is _SENTINEL:
+            break
+        yield item
+
@@ -0,0 +1,37 @@
+from src import all_data
+from src.all_data import _SheetReader
+
+# Dòng 5 trống giữa dữ liệu: Sheets bỏ nó khi nó nằm ở cuối một khoảng đọc.
+SHEET = [["a", "b"]] + [[] if n == 4 else [str(n), "x"] for n in range(1, 10)]
+
+
+def fake_reader(monkeypatch, row_count=1000):
+    monkeypatch.setattr(all_data, "ALL_DATA_CHUNK_ROWS", 4)
+    reader = _SheetReader.__new__(_SheetReader)
+
+    def read_rows(start, end):
+        rows = SHEET[start - 1:end]
+        while rows and not rows[-1]:
+            rows = rows[:-1]
+        return rows
+
+    reader._read_rows = read_rows
+    reader.row_count = row_count
+    reader.all_headers = reader.headers = ["a", "b"]
+    reader.columns = [0, 1]
+    return reader
+
+
+def test_chunks_continue_past_trailing_blank_rows(monkeypatch):
+    records = [r for chunk in fake_reader(monkeypatch).iter_chunks() for r in chunk]
+    assert [r["a"] for r in records] == ["1", "2", "3", "", "5", "6", "7", "8", "9"]
+
+
+def test_pages_continue_past_trailing_blank_rows(monkeypatch):
+    reader = fake_reader(monkeypatch)
+    first = reader.page(2, 4)
+    assert first["count"] == 4 and first["next_cursor"] == "6"
+    second = reader.page(6, 4)
+    assert second["next_cursor"] == "10"
+    last = reader.page(10, 4)
+    assert last["count"] == 1 and last["next_cursor"] is None
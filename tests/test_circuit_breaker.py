@@ -0,0 +1,142 @@
+import time
+
+import pytest
+
+from src.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError,
+                                 DeadlineExceededError, RetryPolicy, deadline_scope)
+
+
+class Flaky:
+    """Lỗi `failures` lần đầu rồi thành công."""
+
+    def __init__(self, failures: int, error: Exception = None):
+        self.failures = failures
+        self.error = error or ConnectionError("mất kết nối")
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+def is_transient(exc: BaseException) -> bool:
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def fail_times(breaker: CircuitBreaker, count: int):
+    for _ in range(count):
+        with pytest.raises(ConnectionError):
+            breaker.call(Flaky(1), is_transient)
+
+
+def test_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=60)
+    fail_times(breaker, 2)
+    assert breaker.state == CLOSED
+    fail_times(breaker, 1)
+    assert breaker.state == OPEN
+
+    fn = Flaky(0)
+    with pytest.raises(CircuitOpenError) as info:
+        breaker.call(fn, is_transient)
+    assert fn.calls == 0
+    assert 0 < info.value.retry_after <= 60
+    assert breaker.status()["rejected"] == 1
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    fail_times(breaker, 1)
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(Flaky(0), is_transient) == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_reopens_on_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    fail_times(breaker, 1)
+    time.sleep(0.06)
+    fail_times(breaker, 1)
+    assert breaker.state == OPEN
+    assert breaker.status()["opened"] == 2
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    fail_times(breaker, 1)
+    time.sleep(0.06)
+
+    def probe():
+        with pytest.raises(CircuitOpenError):
+            breaker.call(Flaky(0), is_transient)
+        return "ok"
+
+    assert breaker.call(probe, is_transient) == "ok"
+
+
+def test_client_errors_do_not_count():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    with pytest.raises(ValueError):
+        breaker.call(Flaky(1, ValueError("4xx")), is_transient)
+    assert breaker.state == CLOSED
+
+
+def test_retries_transient_errors():
+    breaker = CircuitBreaker("test", failure_threshold=10)
+    fn = Flaky(2)
+    assert breaker.call(fn, is_transient, RetryPolicy(3, base_delay=0)) == "ok"
+    assert fn.calls == 3
+    assert breaker.status()["retries"] == 2
+
+
+def test_before_attempt_errors_skip_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    fail_times(breaker, 1)
+    time.sleep(0.06)
+
+    def no_token(budget):
+        raise RuntimeError("hết hạn mức")
+
+    with pytest.raises(RuntimeError):
+        breaker.call(Flaky(0), is_transient, before_attempt=no_token)
+    # Lần thử (probe) chưa chạy nên half_open vẫn cho một lần thử khác.
+    assert breaker.call(Flaky(0), is_transient) == "ok"
+
+
+def test_deadline_stops_retries():
+    breaker = CircuitBreaker("test", failure_threshold=10)
+    fn = Flaky(10, TimeoutError("chậm"))
+
+    def slow():
+        time.sleep(0.2)
+        return fn()
+
+    # Lần thử thứ hai còn kịp (0.2 + 0.2 <= 0.5), lần thứ ba thì không.
+    with deadline_scope(time.monotonic() + 0.5):
+        with pytest.raises(TimeoutError) as info:
+            breaker.call(slow, is_transient, RetryPolicy(10, base_delay=0), attempt_timeout=0.2)
+    assert not isinstance(info.value, DeadlineExceededError)
+    assert fn.calls == 2
+
+
+def test_deadline_too_close_for_first_attempt():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    fn = Flaky(0)
+    with deadline_scope(time.monotonic() + 0.01):
+        with pytest.raises(DeadlineExceededError):
+            breaker.call(fn, is_transient, attempt_timeout=1)
+    assert fn.calls == 0
+    assert breaker.state == CLOSED
+
+
+def test_before_attempt_gets_remaining_budget():
+    breaker = CircuitBreaker("test")
+    budgets = []
+    breaker.call(Flaky(0), is_transient, before_attempt=budgets.append)
+    with deadline_scope(time.monotonic() + 5):
+        breaker.call(Flaky(0), is_transient, before_attempt=budgets.append, attempt_timeout=2)
+    assert budgets[0] is None
+    assert 2.5 < budgets[1] <= 3
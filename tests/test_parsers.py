@@ -0,0 +1,102 @@
+"""Hai engine parse (bs4 trong scraper.py, lxml trong scraper_lxml.py) phải cho cùng kết quả."""
+import pytest
+
+import scraper
+
+ENGINES = ("bs4", "lxml")
+BASE_URL = "https://govolunteerhcmc.vn"
+
+
+def _page(body: str) -> str:
+    return ('<!DOCTYPE html><html lang="vi"><head><meta charset="UTF-8"><title>GoVolunteer</title></head>'
+            f'<body><header><nav><a href="{BASE_URL}/">Trang chủ</a></nav></header>'
+            f'<main>{body}</main><script>var x = "<div>";</script></body></html>')
+
+
+def _post(slug: str, title: str, image: bool = True) -> str:
+    thumbnail = (f'<div class="elementor-post__thumbnail"><img src="{BASE_URL}/wp-content/uploads/{slug}-300x200.jpg">'
+                 '</div>' if image else "")
+    return (f'<article class="elementor-post post-{slug}">'
+            f'<a class="elementor-post__thumbnail__link" href="{BASE_URL}/{slug}/">{thumbnail}</a>'
+            f'<h3 class="elementor-post__title"><a href="{BASE_URL}/{slug}/"> {title} </a></h3></article>')
+
+
+NEWS_PAGE = _page(
+    '<div class="elementor elementor-1096"><section class="elementor-top-section"><div class="elementor-posts">'
+    + _post("tin-1", "Nhật ký tình nguyện 1") + _post("tin-2", "Bài &amp; ảnh", image=False)
+    + '<article class="elementor-post"><h3 class="elementor-post__title">Không có link</h3></article>'
+    + '</div><div class="e-load-more-anchor" data-page="1" data-max-page="4"></div></section></div>')
+
+GENERIC_PAGE = _page(
+    '<div class="elementor elementor-1165">'
+    '<section class="elementor-top-section"><h2 class="elementor-heading-title">Chương trình</h2>'
+    + _post("ct-1", "Xuân tình nguyện") + _post("ct-2", "Mùa hè xanh", image=False) + '</section>'
+    '<section class="elementor-top-section"><h2 class="elementor-heading-title"> Dự án </h2>'
+    + _post("da-1", "Dự án 1") + '</section>'
+    '<section class="elementor-top-section">' + _post("khac", "Không có tiêu đề mục") + '</section></div>')
+
+CLUBS_PAGE = _page(
+    '<div class="elementor elementor-1048">'
+    '<section class="elementor-top-section"><h2 class="elementor-heading-title">Khối trường</h2></section>'
+    '<section class="elementor-top-section">'
+    f'<article class="ecs-post-loop"><img src="{BASE_URL}/wp-content/uploads/clb-1-150x150.png">'
+    f'<a class="elementor-button" href="{BASE_URL}/clb-1/">CLB 1</a></article>'
+    f'<article class="ecs-post-loop"><a class="elementor-button" href="{BASE_URL}/clb-2/">CLB 2</a></article>'
+    '</section></div>')
+
+ARTICLE_PAGE = _page(
+    '<div class="elementor elementor-location-single"><h1>Bài viết</h1>'
+    '<div class="elementor-widget-theme-post-content"><div class="elementor-widget-container">'
+    '<p>Đoạn <strong>một</strong> &amp; hai.</p><figure><img src="/a.jpg" alt=""></figure><br>'
+    '</div></div></div>')
+
+# Container bị "giả" trước đó (trong script, class khác chỉ trùng tiền tố) và container nằm cuối trang.
+DECOY_NEWS_PAGE = NEWS_PAGE.replace(
+    "<main>", '<script>var t = \'<div class="elementor-1096">\';</script><div class="elementor-10960 x">'
+    + _post("gia", "Bài giả") + "</div><main>")
+PREFIX_NEWS_PAGE = NEWS_PAGE.replace(
+    "<main>", '<p>elementor-1096</p><div class="elementor-10960 x">' + _post("gia", "Bài giả") + "</div><main>")
+LAST_CLUBS_PAGE = CLUBS_PAGE.split("</main>")[0]
+
+CASES = {
+    "parse_news_page": lambda get: get("parse_news_page")(NEWS_PAGE, 1),
+    "parse_generic_page": lambda get: get("parse_generic_page")(GENERIC_PAGE, ".elementor-1165"),
+    "parse_clubs": lambda get: get("parse_clubs")(CLUBS_PAGE),
+    "extract_article_content": lambda get: get("extract_article_content")(ARTICLE_PAGE),
+    "parse_news_page[container giả]": lambda get: get("parse_news_page")(DECOY_NEWS_PAGE, 1),
+    "parse_news_page[class trùng tiền tố]": lambda get: get("parse_news_page")(PREFIX_NEWS_PAGE, 1),
+    "parse_clubs[container cuối trang]": lambda get: get("parse_clubs")(LAST_CLUBS_PAGE),
+    "parse_generic_page[không có container]": lambda get: get("parse_generic_page")(NEWS_PAGE, ".elementor-1181"),
+    "parse_clubs[không có container]": lambda get: get("parse_clubs")(NEWS_PAGE),
+    "extract_article_content[không có nội dung]": lambda get: get("extract_article_content")(NEWS_PAGE),
+}
+
+
+def _run(case: str, engine: str):
+    return CASES[case](lambda name: scraper._get_parser(name, engine))
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_engines_agree(case):
+    bs4_result, lxml_result = (_run(case, engine) for engine in ENGINES)
+    assert bs4_result == lxml_result
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_news_page(engine):
+    articles, max_pages = _run("parse_news_page", engine)
+    assert max_pages == 4
+    assert [a["link"] for a in articles] == [f"{BASE_URL}/tin-1/", f"{BASE_URL}/tin-2/"]
+    assert articles[0]["imageUrl"] == f"{BASE_URL}/wp-content/uploads/tin-1.jpg"
+
+
+@pytest.mark.parametrize("case", ["parse_news_page[container giả]", "parse_news_page[class trùng tiền tố]"])
+def test_partial_parse_skips_decoys(case):
+    articles, max_pages = _run(case, "lxml")
+    assert max_pages == 4
+    assert "Bài giả" not in [a["title"] for a in articles]
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        scraper._get_parser("parse_clubs", "html5lib")
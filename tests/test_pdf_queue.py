@@ -0,0 +1,79 @@
+import pytest
+
+from src.pdf_queue import PdfRequestQueue
+from src.quota import QuotaExceededError
+
+
+class Recorder:
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(items)
+        if self.error is not None:
+            raise self.error
+        return [True] * len(items)
+
+
+def make_queue(tmp_path, flush_fn, **kwargs) -> PdfRequestQueue:
+    queue = PdfRequestQueue(flush_fn, path=str(tmp_path / "pdf_requests.db"), **kwargs)
+    # Không chạy thread nền: test tự gọi flush_once.
+    queue.start = lambda: None
+    return queue
+
+
+def test_duplicates_merged_latest_email_wins(tmp_path):
+    flush = Recorder()
+    queue = make_queue(tmp_path, flush)
+    queue.enqueue("Nguyễn Văn A", "001", "cu@example.com")
+    queue.enqueue("Trần Thị B", "002", "b@example.com")
+    queue.enqueue("  nguyễn văn a ", "001 ", "moi@example.com")
+
+    assert queue.flush_once() == 3
+    assert flush.batches == [[("Nguyễn Văn A", "001", "moi@example.com"), ("Trần Thị B", "002", "b@example.com")]]
+    assert queue.pending_count() == 0
+    assert queue.flush_once() == 0
+
+
+def test_batch_size(tmp_path):
+    flush = Recorder()
+    queue = make_queue(tmp_path, flush, batch_size=2)
+    for i in range(3):
+        queue.enqueue(f"Người {i}", str(i), f"{i}@example.com")
+    assert queue.flush_once() == 2
+    assert queue.flush_once() == 1
+    assert [len(batch) for batch in flush.batches] == [2, 1]
+
+
+def test_failed_flush_keeps_requests_until_max_attempts(tmp_path):
+    queue = make_queue(tmp_path, Recorder(RuntimeError("Sheets lỗi")), max_attempts=2)
+    queue.enqueue("Nguyễn Văn A", "001", "a@example.com")
+    with pytest.raises(RuntimeError):
+        queue.flush_once()
+    assert queue.pending_count() == 1
+    with pytest.raises(RuntimeError):
+        queue.flush_once()
+    assert queue.pending_count() == 0
+
+
+def test_quota_error_does_not_count_as_attempt(tmp_path):
+    queue = make_queue(tmp_path, Recorder(QuotaExceededError("Google Sheets (ghi)", 1)), max_attempts=1)
+    queue.enqueue("Nguyễn Văn A", "001", "a@example.com")
+    with pytest.raises(QuotaExceededError):
+        queue.flush_once()
+    assert queue.pending_count() == 1
+
+
+def test_skips_flush_while_another_worker_holds_lock(tmp_path):
+    flush = Recorder()
+    queue = make_queue(tmp_path, flush)
+    # Một hàng đợi khác trên cùng file = worker khác đang ghi.
+    peer = make_queue(tmp_path, Recorder())
+    queue.enqueue("Nguyễn Văn A", "001", "a@example.com")
+    with peer._flush_lock() as acquired:
+        assert acquired
+        assert queue.flush_once() == 0
+    assert flush.batches == []
+    assert queue.pending_count() == 1
+    assert queue.flush_once() == 1
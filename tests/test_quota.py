@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+from src.quota import QuotaExceededError, TokenBucket
+
+
+def test_rejects_instead_of_waiting_too_long():
+    bucket = TokenBucket("test", per_minute=2, max_wait=0)
+    bucket.acquire()
+    bucket.acquire()
+    with pytest.raises(QuotaExceededError) as info:
+        bucket.acquire()
+    assert info.value.retry_after > 0
+    assert bucket.rejected == 1
+
+
+def test_buckets_with_same_path_share_budget(tmp_path):
+    path = str(tmp_path / "quota.db")
+    # Hai bucket cùng tên trên cùng file = hai worker dùng chung một hạn mức.
+    first = TokenBucket("test", per_minute=3, max_wait=0, path=path)
+    second = TokenBucket("test", per_minute=3, max_wait=0, path=path)
+    first.acquire()
+    second.acquire()
+    first.acquire()
+    with pytest.raises(QuotaExceededError):
+        second.acquire()
+    assert second.available < 1
+
+
+def test_available_does_not_write(tmp_path):
+    path = str(tmp_path / "quota.db")
+    bucket = TokenBucket("test", per_minute=60, max_wait=0, path=path)
+    bucket.acquire()
+    conn = sqlite3.connect(path)
+    before = conn.execute("SELECT tokens, updated FROM quota_buckets").fetchall()
+    assert 0 < bucket.available <= 60
+    assert conn.execute("SELECT tokens, updated FROM quota_buckets").fetchall() == before
@@ -0,0 +1,40 @@
+import scraper
+
+
+def article(n: int):
+    return {"title": f"Bài {n}", "link": f"https://example.com/bai-{n}/", "imageUrl": ""}
+
+
+def fake_pages(monkeypatch, pages):
+    fetched = []
+
+    def fetch(page, parser=None):
+        fetched.append(page)
+        return pages[page - 1], len(pages)
+
+    monkeypatch.setattr(scraper, "_fetch_news_page", fetch)
+    return fetched
+
+
+def test_incremental_stops_at_first_known_page(monkeypatch, capsys):
+    previous = [{"category": scraper.NEWS_CATEGORY, "articles": [article(n) for n in (3, 2, 1)]}]
+    updated = dict(article(3), title="Bài 3 (sửa)")
+    fetched = fake_pages(monkeypatch, [[article(5), article(4)], [updated, article(2)], [article(1)]])
+
+    result = scraper.scrape_news_incremental(previous)
+    assert fetched == [1, 2]
+    links = [a["link"] for a in result[0]["articles"]]
+    assert links == [article(n)["link"] for n in (5, 4, 3, 2, 1)]
+    assert result[0]["articles"][2]["title"] == "Bài 3 (sửa)"
+
+
+def test_incremental_without_previous_reads_all_pages(monkeypatch, capsys):
+    fetched = fake_pages(monkeypatch, [[article(2)], [article(1)]])
+    result = scraper.scrape_news_incremental([])
+    assert fetched == [1, 2]
+    assert [a["title"] for a in result[0]["articles"]] == ["Bài 2", "Bài 1"]
+
+
+def test_incremental_first_page_error(monkeypatch, capsys):
+    monkeypatch.setattr(scraper, "_fetch_news_page", lambda page, parser=None: None)
+    assert scraper.scrape_news_incremental([{"category": scraper.NEWS_CATEGORY, "articles": [article(1)]}]) == []
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from src.cache import SWRCache
+from src.sheet_index import SheetIndex
+from src.snapshot_store import SnapshotStore
+
+VALUES = [["User_Name", "CCCD"], ["An", "1"]]
+
+
+def hold_lock_and_save(store, key, value, delay=0.3):
+    """Giả lập worker khác đang làm mới `key`: giữ khoá, ghi bản mới rồi nhả khoá."""
+    locked = threading.Event()
+
+    def peer():
+        with store.process_lock(key):
+            locked.set()
+            time.sleep(delay)
+            store.save(key, value, time.time())
+
+    thread = threading.Thread(target=peer)
+    thread.start()
+    locked.wait()
+    return thread
+
+
+def test_stale_index_waits_for_peer_refresh(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    store.save("sheet:s", VALUES, time.time() - 3600)
+    fetched = []
+    index = SheetIndex("s", lambda sid: fetched.append(sid) or VALUES, store=store)
+    index.auto_refresh = False
+    index._snapshot = index._build(store.load("sheet:s")[0], time.time() - 3600, stale=True)
+
+    peer = hold_lock_and_save(store, "sheet:s", VALUES + [["Bình", "2"]])
+    snapshot = index.refresh_shared()
+    peer.join()
+    assert fetched == []
+    assert not snapshot.stale and ("bình", "2") in snapshot.rows
+
+
+def test_stale_cache_entry_waits_for_peer_refresh(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    store.save("scrape:news", ["cũ"], time.time() - 3600)
+    cache = SWRCache(store=store, namespace="scrape")
+    cache.register("news", lambda: ["tự tải"], ttl=60)
+    assert cache.load_snapshots() == 1
+
+    peer = hold_lock_and_save(store, "scrape:news", ["mới"])
+    entry = cache.refresh("news")
+    peer.join()
+    assert entry.value == ["mới"] and not entry.stale
+
+
+def test_peer_adopts_encoded_payload_without_reencoding(tmp_path, monkeypatch):
+    from src import payload
+    from src.payload import EncodedPayload
+
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    writer = SWRCache(store=store, namespace="scrape", encode=EncodedPayload, restore=EncodedPayload.restore)
+    writer.register("news", lambda: [{"title": "Tin mới"}], ttl=60)
+    written = writer.refresh("news").encoded
+
+    reader = SWRCache(store=store, namespace="scrape", encode=EncodedPayload, restore=EncodedPayload.restore)
+    reader.register("news", lambda: [], ttl=60)
+    monkeypatch.setattr(payload, "dumps", lambda value: (_ for _ in ()).throw(AssertionError("mã hoá lại")))
+    entry = reader.get_entry("news")
+    assert (entry.encoded.body, entry.encoded.etag, entry.encoded.variants) == (
+        written.body, written.etag, written.variants)
+    assert entry.value == [{"title": "Tin mới"}]